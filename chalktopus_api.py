@@ -0,0 +1,261 @@
+"""Read-only JSON API over the parsed logs, using only the standard library.
+
+    python chalktopus_api.py --port 8765
+
+    GET /datasets
+    GET /scores?dataset=alice&method=Power Scaling (x^1.5)&start=2024-01-01&end=2024-06-30&location=CENTRAL ROCK
+    GET /weekly?location=MOVEMENT, VA
+    GET /monthly-visits?start=2024-01-01
+    GET /visits
+
+start and end are inclusive dates. location may be repeated; each is a gym
+name resolved the same way as the log's own Location column. Weekly and
+monthly rows are the periods that end within the date range.
+
+Responses are cached per dataset version and query, and carry an ETag made
+from the two, so a poller sending If-None-Match gets a 304 without the
+response being rebuilt. A new version of the dataset changes every ETag.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import chalktopus_core as core
+import chalktopus_datasets as datasets
+from chalktopus_core import clean_location
+from chalktopus_locations import resolve_names
+
+
+# Upper bound on cached response bodies, kept apart from the shared sessions and aggregates
+MAX_RESPONSE_BYTES = int(float(os.environ.get("CHALKTOPUS_API_CACHE_MB", 64)) * 1024 * 1024)
+
+# Response bodies keyed by (dataset, version, request key), least recently used first
+_responses = OrderedDict()
+_response_bytes = 0
+_responses_lock = threading.Lock()
+
+
+class QueryError(ValueError):
+    """A request the API can't answer; reported to the client as a 400"""
+
+
+def _dates(query):
+    try:
+        start = pd.Timestamp(query["start"][0]) if "start" in query else None
+        end = pd.Timestamp(query["end"][0]) if "end" in query else None
+    except ValueError as e:
+        raise QueryError(f"bad date: {e}") from None
+    return start, end
+
+
+def _locations(query):
+    if "location" not in query:
+        return None
+    names = {clean_location(value): value for value in query["location"]}
+    # Query strings are client input, so their fuzzy matches aren't written to the on-disk memo
+    resolved = resolve_names(set(names), save=False)
+    return sorted({resolved[name] for name in names})
+
+
+def _in_range(index, start, end):
+    keep = pd.Series(True, index=index)
+    if start is not None:
+        keep &= index >= start
+    if end is not None:
+        # End dates are inclusive, including any time on that day
+        keep &= index < end + pd.Timedelta(days=1)
+    # A copy, since callers narrow it in place and pandas hands out read-only views
+    return keep.to_numpy(copy=True)
+
+
+def _filtered_sessions(data, query):
+    start, end = _dates(query)
+    locations = _locations(query)
+    keep = _in_range(pd.DatetimeIndex(data["Dates"]), start, end)
+    if locations is not None:
+        keep &= data["Location"].isin(locations).to_numpy()
+    return keep
+
+
+def scores(data, method_scores, cube, query):
+    """Daily score per scoring method for each session"""
+    methods = list(method_scores.columns)
+    if "method" in query:
+        unknown = [method for method in query["method"] if method not in methods]
+        if unknown:
+            raise QueryError(f"unknown method {unknown[0]!r}; choose from {methods}")
+        methods = query["method"]
+    keep = _filtered_sessions(data, query)
+    return pd.concat([data.loc[keep, ["Dates", "Location"]], method_scores.loc[keep, methods]], axis=1).sort_values("Dates")
+
+
+def weekly(data, method_scores, cube, query):
+    """Completed and tried climbs per grade, and sessions, per week"""
+    start, end = _dates(query)
+    totals = core.rollup_slice(cube, "week", _locations(query))
+    columns = ["Sessions"] + core.completed_columns(data) + core.tried_columns(data)
+    return totals.loc[_in_range(totals.index, start, end), columns].rename_axis("Week").reset_index()
+
+
+def monthly_visits(data, method_scores, cube, query):
+    """Sessions per month, including months with none"""
+    start, end = _dates(query)
+    visits = core.rollup_monthly_visits(cube, _locations(query))
+    return visits.loc[_in_range(visits.index, start, end)].rename("Visits").rename_axis("Month").reset_index()
+
+
+def visits(data, method_scores, cube, query):
+    """Sessions per gym"""
+    counts = core.location_visits(data.loc[_filtered_sessions(data, query)])
+    return pd.DataFrame({"Location": list(counts), "Visits": list(counts.values())}).sort_values("Visits", ascending=False)
+
+
+ENDPOINTS = {
+    "/scores": scores,
+    "/weekly": weekly,
+    "/monthly-visits": monthly_visits,
+    "/visits": visits,
+}
+
+
+def request_key(path, query):
+    """Canonical form of a request, so parameter order doesn't split the cache"""
+    return json.dumps([path, sorted(query.items())])
+
+
+def etag(dataset, version, key):
+    return '"' + hashlib.sha1(json.dumps([dataset, version, key]).encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def build_response(dataset, version, data, path, query):
+    """JSON body for an endpoint, built from the shared scores and rollup cube"""
+    method_scores = datasets.cached(dataset, "scores", version, lambda: core.score_methods(data, core.get_scoring_methods()))
+    cube = datasets.cached(dataset, "rollup_cube", version, lambda: core.build_rollup_cube(data, method_scores))
+    rows = ENDPOINTS[path](data, method_scores, cube, query)
+    header = json.dumps({"dataset": dataset, "version": version, "count": len(rows)})
+    return f'{header[:-1]}, "rows": {rows.to_json(orient="records", date_format="iso", index=False)}}}'.encode("utf-8")
+
+
+def cached_response(dataset, version, key, build):
+    """Body for a request, calling build() only if it isn't cached for this dataset version"""
+    global _response_bytes
+    cache_key = (dataset, version, key)
+    with _responses_lock:
+        if cache_key in _responses:
+            _responses.move_to_end(cache_key)
+            return _responses[cache_key]
+
+    body = build()
+
+    with _responses_lock:
+        if cache_key not in _responses:
+            # Bodies for an older version of the dataset can't be served again
+            for old_key in [k for k in _responses if k[0] == dataset and k[1] != version]:
+                _response_bytes -= len(_responses.pop(old_key))
+            _responses[cache_key] = body
+            _response_bytes += len(body)
+            while _response_bytes > MAX_RESPONSE_BYTES and len(_responses) > 1:
+                _, evicted = _responses.popitem(last=False)
+                _response_bytes -= len(evicted)
+    return body
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so pollers and the load test don't pay for a new connection per request
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, each response waits on a delayed ACK
+    disable_nagle_algorithm = True
+    default_dataset = datasets.DEFAULT_DATASET
+    quiet = True
+
+    def _send(self, status, body=b"", tag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        # Clients may keep the body but must revalidate it, which is what the ETag makes cheap
+        self.send_header("Cache-Control", "no-cache")
+        if tag:
+            self.send_header("ETag", tag)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        specs = datasets.load_datasets()
+        if url.path == "/datasets":
+            return self._send(200, json.dumps({"datasets": list(specs)}).encode("utf-8"))
+        if url.path not in ENDPOINTS:
+            return self._error(404, f"no endpoint {url.path}; try {['/datasets'] + list(ENDPOINTS)}")
+
+        dataset = query.pop("dataset", [self.default_dataset])[0]
+        if dataset not in specs:
+            return self._error(404, f"no dataset {dataset!r}")
+        try:
+            data, info = datasets.load_dataset(dataset, datasets=specs)
+        except Exception as e:
+            return self._error(503, f"could not load {dataset}: {e}")
+
+        version = info["version"]
+        key = request_key(url.path, query)
+        tag = etag(dataset, version, key)
+        if tag in (value.strip() for value in self.headers.get("If-None-Match", "").split(",")):
+            return self._send(304, tag=tag)
+        try:
+            body = cached_response(dataset, version, key, lambda: build_response(dataset, version, data, url.path, query))
+        except QueryError as e:
+            return self._error(400, str(e))
+        except Exception as e:
+            return self._error(500, f"{type(e).__name__}: {e}")
+        self._send(200, body, tag)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(host="127.0.0.1", port=8765, dataset=datasets.DEFAULT_DATASET, quiet=True):
+    handler = type("ChalktopusHandler", (Handler,), {"default_dataset": dataset, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(host="127.0.0.1", port=8765, dataset=datasets.DEFAULT_DATASET, quiet=True):
+    """Start the API on a background thread and return the server; call shutdown() to stop it"""
+    server = make_server(host, port, dataset, quiet)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve chalktopus scores and aggregates as JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dataset", default=datasets.DEFAULT_DATASET, help="dataset used when a request doesn't name one")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.dataset, quiet=not args.verbose)
+    print(f"Serving chalktopus API on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Per-stage timings for the chalktopus pipeline on synthetic logs.
+
+    python chalktopus_bench.py --sessions 1000 10000 50000 --years 10
+
+Each run appends one JSON line per log size to the results file, tagged with
+the current git commit, and prints the change against the previous run of
+the same size so regressions show up across commits.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import as_completed
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+
+import chalktopus_core as core
+import chalktopus_render as render
+from chalktopus_calendar import calendar_grid, color_limits, draw_year
+from chalktopus_dates import parse_dates
+from chalktopus_figcache import figure_bytes
+from chalktopus_ingest import clear_cache, ingest_rows
+from chalktopus_locations import resolve_locations
+from chalktopus_snapshot import SNAPSHOT_DIR
+from chalktopus_synth import generate_log
+
+# Appended to on every run
+RESULTS_PATH = os.environ.get("CHALKTOPUS_BENCH_RESULTS", os.path.join(SNAPSHOT_DIR, "bench_results.jsonl"))
+
+# A stage this much slower than last time is flagged
+REGRESSION_THRESHOLD = 1.2
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_stage(func, repeat):
+    """Best wall time of func() over repeat runs, and its last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def chart_jobs(data, column, visits):
+    """(stage name, draw function, args) for the dashboard's charts on this log"""
+    points = data.iloc[core.downsample_indices(data[column].to_numpy(dtype=float), 1000)]
+    freq, bin_label, bin_width = core.choose_time_bin(data["Dates"])
+    return [
+        ("chart_trend", render.draw_trend, (points, column, "Trend", "Score")),
+        ("chart_total_climbs", render.draw_bars, (core.total_climbs(data), "Grade", "Total Climbs", "Total Climbs")),
+        ("chart_average_per_week", render.draw_bars, (core.average_climbs_per_week(data), "Grade", "Per Week", "Average Climbs per Week")),
+        ("chart_monthly_visits", render.draw_monthly_visits, (visits.rename("Visits").rename_axis("Month").reset_index(),)),
+        ("chart_difficulty", render.draw_difficulty, (core.binned_grade_counts(data, freq), core.available_grades(data), bin_label, bin_width, False)),
+    ]
+
+
+def chart_calendar(data, column):
+    years, grid, in_year = calendar_grid(data["Dates"], data[column])
+    vmin, vmax = color_limits(grid)
+    return [figure_bytes(draw_year(grid[i], in_year[i], year, vmin, vmax)) for i, year in enumerate(years)]
+
+
+def charts_pooled(data, column, visits):
+    """All the charts submitted together to the render pool (inline when RENDER_WORKERS is 1)"""
+    years, grid, in_year = calendar_grid(data["Dates"], data[column])
+    vmin, vmax = color_limits(grid)
+    futures = [render.submit(chart, *args) for _, chart, args in chart_jobs(data, column, visits)]
+    futures += [render.submit(draw_year, grid[i], in_year[i], year, vmin, vmax) for i, year in enumerate(years)]
+    return [future.result() for future in as_completed(futures)]
+
+
+def run_benchmark(sessions, years, gyms, seed=0, repeat=3, charts=True):
+    """Time every stage on one synthetic log and return {stage: seconds}"""
+    log = generate_log(sessions, years, gyms, seed=seed)
+    buffer = io.StringIO()
+    log.to_csv(buffer, index=False)
+    csv_text = buffer.getvalue()
+
+    timings = {}
+
+    def stage(name, func):
+        timings[name], result = time_stage(func, repeat)
+        return result
+
+    raw = stage("csv_load", lambda: pd.read_csv(io.StringIO(csv_text)))
+    grades = [col for col in core.GRADES if col in raw.columns]
+    stage("locations", lambda: resolve_locations(raw["Location"]))
+    stage("dates", lambda: parse_dates(raw["Dates"], source="bench"))
+    stage("grade_parsing", lambda: core.parse_grade_columns(raw, grades))
+
+    def cold_ingest():
+        clear_cache("bench")
+        return ingest_rows(raw, source="bench")[0]
+
+    data = stage("ingest", cold_ingest).sort_values("Dates")
+    stage("ingest_unchanged", lambda: ingest_rows(raw, source="bench"))
+
+    scores = stage("scoring", lambda: core.score_methods(data))
+    data["Daily_Score"] = scores[next(iter(core.get_scoring_methods()))]
+    stage("weekly_rollup", lambda: core.weekly_climbs(data))
+    visits = stage("monthly_rollup", lambda: core.monthly_visits(data))
+    stage("rollup_cube", lambda: core.build_rollup_cube(data, scores))
+
+    completed = core.completed_columns(data)
+    frame = pd.concat([data[["Dates"] + completed], scores], axis=1)
+    stage("rolling_windows", lambda: [
+        core.rolling_window(core.build_rolling_state(frame, completed + list(scores.columns)), window)
+        for window in core.ROLLING_WINDOWS
+    ])
+
+    if charts:
+        # Drawn and rasterized to PNG in this process, as a render worker would
+        for name, chart, args in chart_jobs(data, "Daily_Score", visits):
+            stage(name, lambda: render.render_chart(chart, args))
+        stage("chart_calendar", lambda: chart_calendar(data, "Daily_Score"))
+        # What appending a session costs: only its own year's panel is redrawn
+        stage("chart_calendar_one_year", lambda: chart_calendar(data[data["Dates"] >= data["Dates"].max().replace(month=1, day=1)], "Daily_Score"))
+        # The same charts at once, with CHALKTOPUS_RENDER_WORKERS processes
+        stage(f"charts_pool_{render.RENDER_WORKERS}", lambda: charts_pooled(data, "Daily_Score", visits))
+    return timings
+
+
+def load_results(path=RESULTS_PATH):
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+def previous_run(results, config):
+    """Latest saved run with the same log configuration"""
+    for entry in reversed(results):
+        if entry.get("config") == config:
+            return entry
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each chalktopus stage on synthetic logs")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1000, 10000, 50000], help="log sizes to run")
+    parser.add_argument("--years", type=float, default=10, help="span of each log in years (default: 10)")
+    parser.add_argument("--gyms", type=int, default=4, help="number of gyms (default: 4)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the best is kept (default: 3)")
+    parser.add_argument("--no-charts", action="store_true", help="skip the chart stages")
+    parser.add_argument("--results", default=RESULTS_PATH, help=f"JSON lines file to append to (default: {RESULTS_PATH})")
+    parser.add_argument("--no-save", action="store_true", help="don't append this run to the results file")
+    args = parser.parse_args(argv)
+
+    history = load_results(args.results)
+    commit = _git_commit()
+    entries = []
+    for sessions in args.sessions:
+        config = {"sessions": sessions, "years": args.years, "gyms": args.gyms, "seed": args.seed, "charts": not args.no_charts}
+        timings = run_benchmark(sessions, args.years, args.gyms, args.seed, args.repeat, charts=not args.no_charts)
+        previous = previous_run(history, config)
+
+        print(f"# {sessions} sessions over {args.years:g} years" + (f" (vs {previous['commit']})" if previous else ""))
+        for name, seconds in timings.items():
+            line = f"{name:24s} {seconds * 1000:10.1f} ms"
+            before = previous["timings"].get(name) if previous else None
+            if before:
+                ratio = seconds / before
+                line += f"  {ratio:5.2f}x" + ("  REGRESSION" if ratio > REGRESSION_THRESHOLD else "")
+            print(line)
+
+        entries.append({
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "config": config,
+            "timings": timings,
+        })
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+        with open(args.results, "a") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        print(f"Saved {len(entries)} runs to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
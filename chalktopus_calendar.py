@@ -0,0 +1,84 @@
+import numpy as np
+
+# Weeks touched by one calendar year: 53 full or partial weeks, 54 when a leap year starts on a Sunday
+WEEKS_PER_YEAR = 54
+
+WEEKDAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MONTH_LABELS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def _grid_position(days, first_year):
+    """(year row, weekday, week column) of each day; weeks start on Monday, week 0 holds 1 January"""
+    years = days.astype("datetime64[Y]")
+    jan1 = years.astype("datetime64[D]")
+    # 1970-01-01 was a Thursday, so day numbers shifted by 3 are Monday-based weekdays
+    weekday = (days.astype(np.int64) + 3) % 7
+    jan1_weekday = (jan1.astype(np.int64) + 3) % 7
+    week = ((days - jan1).astype(np.int64) + jan1_weekday) // 7
+    return (years - first_year).astype(np.int64), weekday, week
+
+
+def calendar_grid(dates, values):
+    """Daily totals laid out as one weekday x week grid per year.
+
+    Returns (years, grid, in_year): grid has shape (years, 7, WEEKS_PER_YEAR)
+    with the summed values of each day and NaN on days without a session;
+    in_year marks the cells that are real days of that year.
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnat(days) & np.isfinite(values)
+    days, values = days[valid], values[valid]
+    if not len(days):
+        return np.array([], dtype=int), np.empty((0, 7, WEEKS_PER_YEAR)), np.empty((0, 7, WEEKS_PER_YEAR), dtype=bool)
+
+    first_year = days.min().astype("datetime64[Y]")
+    last_year = days.max().astype("datetime64[Y]")
+    years = np.arange(first_year, last_year + 1)
+    shape = (len(years), 7, WEEKS_PER_YEAR)
+
+    totals = np.zeros(shape)
+    sessions = np.zeros(shape, dtype=np.int64)
+    position = _grid_position(days, first_year)
+    np.add.at(totals, position, values)
+    np.add.at(sessions, position, 1)
+
+    in_year = np.zeros(shape, dtype=bool)
+    every_day = np.arange(first_year.astype("datetime64[D]"), (last_year + 1).astype("datetime64[D]"))
+    in_year[_grid_position(every_day, first_year)] = True
+
+    grid = np.where(sessions > 0, totals, np.nan)
+    return years.astype(int) + 1970, grid, in_year
+
+
+def month_starts(year):
+    """Week column of the first day of each month, for the x-axis labels"""
+    starts = np.arange(f"{year}-01", f"{year + 1}-01", dtype="datetime64[M]").astype("datetime64[D]")
+    return _grid_position(starts, np.datetime64(str(year), "Y"))[2]
+
+
+def draw_year(grid, in_year, year, vmin, vmax, cmap="coolwarm"):
+    """One year's panel: a cell per day, grey for days without a session"""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 2.2))
+    ax.imshow(np.where(in_year, 1.0, np.nan), cmap="Greys", vmin=0, vmax=12, aspect="equal", interpolation="nearest")
+    image = ax.imshow(grid, cmap=cmap, vmin=vmin, vmax=vmax, aspect="equal", interpolation="nearest")
+    # White lines between the cells, as two line collections rather than an edge or tick per cell
+    ax.vlines(np.arange(WEEKS_PER_YEAR + 1) - 0.5, -0.5, 6.5, color="white", linewidth=1.5)
+    ax.hlines(np.arange(8) - 0.5, -0.5, WEEKS_PER_YEAR - 0.5, color="white", linewidth=1.5)
+    ax.set_yticks(np.arange(7), WEEKDAY_LABELS, fontsize=8)
+    ax.set_xticks(month_starts(year), MONTH_LABELS, fontsize=8, ha="left")
+    ax.tick_params(length=0)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.set_ylabel(str(year), fontsize=14, color="grey")
+    fig.colorbar(image, ax=ax, fraction=0.02, pad=0.01)
+    return fig
+
+
+def color_limits(grid):
+    """Shared color scale for every year's panel"""
+    if not np.isfinite(grid).any():
+        return 0.0, 1.0
+    return float(np.nanmin(grid)), float(np.nanmax(grid))
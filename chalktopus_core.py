@@ -0,0 +1,546 @@
+"""Headless chalktopus core: parsing, scoring and rollups on pandas/NumPy only.
+
+Run as a script to score one or more climbing logs without the dashboard:
+
+    python chalktopus_core.py 20250212_rockclimbing.csv --report all --output-dir out/
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+GRADES = ["vb", "v0", "v1", "v2", "v3", "v4", "v5", "v6"]
+
+# Define different scoring methods
+def get_scoring_methods():
+    """Return dictionary of different scoring methods for climbing grades"""
+    return {
+        "Original Exponential": {"vb": 0.5, "v0": 1, "v1": 2, "v2": 4, "v3": 8, "v4": 12},
+        "Extended Exponential": {"vb": 0.5, "v0": 1, "v1": 2, "v2": 4, "v3": 8, "v4": 12, "v5": 20, "v6": 32},
+        "Fibonacci Progression": {"vb": 1, "v0": 1, "v1": 2, "v2": 3, "v3": 5, "v4": 8, "v5": 13, "v6": 21},
+        "Power Scaling (x^1.5)": {
+            "vb": round(0.5 ** 1.5, 1), 
+            "v0": round(1 ** 1.5, 1), 
+            "v1": round(2 ** 1.5, 1), 
+            "v2": round(3 ** 1.5, 1), 
+            "v3": round(4 ** 1.5, 1), 
+            "v4": round(5 ** 1.5, 1),
+            "v5": round(6 ** 1.5, 1),
+            "v6": round(7 ** 1.5, 1)
+        },
+        "Climbing Difficulty Curve (1.5x)": {
+            "vb": 1,
+            "v0": 2,
+            "v1": 3,
+            "v2": 5,
+            "v3": 7,
+            "v4": 11,
+            "v5": 16,
+            "v6": 24
+        }
+    }
+
+SCORING_DESCRIPTIONS = {
+    "Original Exponential": "Classic exponential doubling pattern (1, 2, 4, 8, 12)",
+    "Extended Exponential": "Continues exponential pattern to higher grades",
+    "Fibonacci Progression": "Natural growth following Fibonacci sequence",
+    "Power Scaling (x^1.5)": "Mathematical power scaling based on grade^1.5",
+    "Climbing Difficulty Curve (1.5x)": "Reflects real climbing difficulty progression (~1.5x multiplier)"
+}
+
+
+# Map known variations to canonical location keys
+LOCATION_ALIASES = {
+    'VERTICALVENTURES': 'VERTICAL VENTURES',
+    'VERTICAL VENTURES': 'VERTICAL VENTURES',
+    'CENTRAL ROCK': 'CENTRAL ROCK',
+    'MOVEMENT, VA': 'MOVEMENT, VA',
+    'MOVEMENT, MD': 'MOVEMENT, MD',
+    'UPLIFT, WA': 'UPLIFT',
+    'UPLIFT': 'UPLIFT',
+    'EDINBURGH INTERNATIONAL CLIMBING ARENA': 'EDINBURGH INTERNATIONAL CLIMBING ARENA',
+}
+
+
+# Clean up location names: normalize for consistency
+def clean_location(loc):
+    """Uppercase, collapse whitespace and use a single ", " between name parts"""
+    loc = ' '.join(str(loc).upper().split())
+    return ', '.join(part.strip() for part in loc.split(',')).strip()
+
+
+def normalize_location(loc):
+    if pd.isna(loc):
+        return loc
+    loc = clean_location(loc)
+    return LOCATION_ALIASES.get(loc, loc)
+
+
+# Grade cells look like "3", "tried", "tried 2" or "1 tried 3 other";
+# empty cells come through as NaN.
+def parse_grade_columns(data, grades):
+    """Return (completed, tried) integer matrices of shape rows x grades"""
+    cells = data[grades]
+    completed = np.zeros(cells.shape, dtype=np.int64)
+    tried = np.zeros(cells.shape, dtype=np.int64)
+
+    numeric = [i for i, col in enumerate(grades) if pd.api.types.is_numeric_dtype(cells[col])]
+    text = [i for i in range(len(grades)) if i not in numeric]
+
+    # Purely numeric columns (blank grades, or sheets with no notes) are truncated like int()
+    if numeric:
+        values = cells.iloc[:, numeric].to_numpy(dtype=float)
+        completed[:, numeric] = np.trunc(np.nan_to_num(values, nan=0, posinf=0, neginf=0))
+
+    if text:
+        # Stack all text columns into one series and parse each distinct cell once
+        codes, uniques = pd.factorize(cells.iloc[:, text].to_numpy(dtype=object).ravel(order="F"))
+        flat = pd.Series(uniques, dtype="string")
+
+        def to_int(matches):
+            return pd.to_numeric(matches, errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+
+        n_parts = flat.str.count(r"\S+").fillna(0).to_numpy()
+        has_tried = flat.str.contains(r"(?:^|\s)tried(?=\s|$)").fillna(False).to_numpy(dtype=bool)
+
+        # Format: "1 tried 3 other" -- numbers either side of the first "tried"
+        around = flat.str.extract(r"(?:^\s*|(\S+)\s+)tried(?=\s|$)(?:\s+(\S+))?")
+        before = to_int(around[0].where(around[0].str.fullmatch(r"\d+").fillna(False)))
+        after = to_int(around[1].where(around[1].str.fullmatch(r"\d+").fillna(False)))
+
+        # Format: "tried X" -- the first number anywhere in the cell
+        first_number = to_int(flat.str.extract(r"(?:^|\s)(\d+)(?=\s|$)")[0])
+
+        # Plain number with nothing else in the cell
+        plain = flat.str.fullmatch(r"\d+").fillna(False).to_numpy(dtype=bool)
+        plain_number = to_int(flat.where(plain))
+
+        long_tried = has_tried & (n_parts >= 3)
+        short_tried = has_tried & (n_parts < 3)
+        text_completed = np.select([long_tried, plain], [before, plain_number], 0)
+        text_tried = np.select([long_tried, short_tried], [after, first_number], 0)
+
+        # Blank cells factorize to -1, which picks up the trailing zero
+        shape = (len(cells), len(text))
+        completed[:, text] = np.append(text_completed, 0)[codes].reshape(shape, order="F")
+        tried[:, text] = np.append(text_tried, 0)[codes].reshape(shape, order="F")
+
+    return completed, tried
+
+
+def available_grades(data):
+    """Return the grades that have parsed count columns in data"""
+    return [grade for grade in GRADES if f"{grade}_completed" in data.columns]
+
+
+def completed_columns(data):
+    return [f"{grade}_completed" for grade in available_grades(data)]
+
+
+def tried_columns(data):
+    return [f"{grade}_tried" for grade in available_grades(data)]
+
+
+# Compile every scoring method into one (methods x grades) weight matrix so a
+# single product scores all methods; grades a method doesn't weight count as 0
+def build_weight_matrix(scoring_methods, grades):
+    """Return a methods x grades DataFrame of grade weights"""
+    return pd.DataFrame(
+        [[weights.get(grade, 0) for grade in grades] for weights in scoring_methods.values()],
+        index=list(scoring_methods.keys()),
+        columns=grades,
+        dtype=float,
+    )
+
+
+def score_methods(data, scoring_methods=None):
+    """Return a DataFrame with one daily score column per scoring method"""
+    scoring_methods = scoring_methods or get_scoring_methods()
+    weight_matrix = build_weight_matrix(scoring_methods, available_grades(data))
+    counts = data[completed_columns(data)].to_numpy(dtype=float)
+    return pd.DataFrame(counts @ weight_matrix.to_numpy().T, index=data.index, columns=weight_matrix.index)
+
+
+# Parametric weight curves for the scoring sweep, as functions of (parameter column, grade position row).
+# Positions count from vb = 0; "power" uses the grade numbers behind "Power Scaling" (vb = 0.5, vN = N + 1).
+SWEEP_FAMILIES = {
+    "power": lambda p, i: np.where(i == 0, 0.5, i.astype(float)) ** p,
+    "geometric": lambda r, i: r ** (i - 1.0),
+    "fibonacci": lambda k, i: _fibonacci(i + 1 + np.round(k).astype(int)),
+}
+
+# Default parameter grids. p = 1.5 gives "Power Scaling" (before its rounding) and offset 0 gives "Fibonacci
+# Progression"; r = 2 gives 0.5, 1, 2, ..., 64, which follows the exponential tables only up to v3 (they go 12, 20, 32)
+SWEEP_DEFAULTS = {
+    "power": (0.5, 3.0),
+    "geometric": (1.1, 3.0),
+    "fibonacci": (0, 5),
+}
+
+# Parameter sets scored at once; bounds the params x sessions score matrix
+SWEEP_BLOCK_CELLS = 4_000_000
+
+
+def _fibonacci(n):
+    """Fibonacci numbers F(n) with F(1) = F(2) = 1, elementwise via Binet's formula"""
+    phi = (1 + 5 ** 0.5) / 2
+    return np.round(phi ** n / 5 ** 0.5)
+
+
+def sweep_weights(family, params, grades):
+    """params x grades weight matrix for a parametric family"""
+    positions = np.array([GRADES.index(grade) for grade in grades])
+    return SWEEP_FAMILIES[family](np.asarray(params, dtype=float)[:, None], positions[None, :])
+
+
+def _weighted_ranks(scores, counts):
+    """Average (tie-aware) ranks of each column's score within its row, where column j stands for counts[j] sessions"""
+    order = np.argsort(scores, axis=1, kind="stable")
+    ordered = np.take_along_axis(scores, order, axis=1)
+    sessions = counts[order]
+    through = np.cumsum(sessions, axis=1)
+    starts = np.ones(ordered.shape, dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    ends = np.ones(ordered.shape, dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    # Sessions ranked below each tie group, and through its end
+    below = np.maximum.accumulate(np.where(starts, through - sessions, 0), axis=1)
+    upto = np.minimum.accumulate(np.where(ends, through, np.inf)[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.empty(scores.shape)
+    np.put_along_axis(ranks, order, (below + 1 + upto) / 2, axis=1)
+    return ranks
+
+
+def _weighted_correlation(a, b, counts):
+    total = counts.sum()
+    a = a - (a @ counts / total)[:, None]
+    b = b - (b @ counts / total)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ((a * b) @ counts) / np.sqrt(((a * a) @ counts) * ((b * b) @ counts))
+
+
+def sweep_scoring(data, family, params, reference=None):
+    """Score every session under each parameter set of a family and summarize each curve.
+
+    All parameter sets are scored in one broadcast product (params x sessions
+    x grades). Sessions with the same completed counts always score the same,
+    so the product runs over the distinct count patterns, weighted by how many
+    sessions share each one. Per parameter the result has:
+      slope_per_year   least-squares trend of the daily score
+      relative_slope   that trend as a fraction of the mean score, comparable across curves
+      variance, cv     spread of daily scores, and spread relative to the mean
+      rank_vs_reference  Spearman correlation of session rankings with the reference curve
+      rank_vs_next     Spearman correlation with the next parameter in the grid
+    reference is a {grade: weight} table and defaults to the first scoring method.
+    """
+    data = data.dropna(subset=["Dates"])
+    grades = available_grades(data)
+    patterns, pattern_of, sessions = np.unique(
+        data[completed_columns(data)].to_numpy(dtype=float), axis=0, return_inverse=True, return_counts=True
+    )
+    pattern_of = pattern_of.ravel()
+    total = len(data)
+    params = np.asarray(params, dtype=float)
+
+    reference = reference or next(iter(get_scoring_methods().values()))
+    reference_scores = patterns @ np.array([reference.get(grade, 0) for grade in grades], dtype=float)
+    reference_ranks = _weighted_ranks(reference_scores[None, :], sessions)
+
+    # Scores enter the trend only through each pattern's summed (centered) session times
+    years = (data["Dates"] - data["Dates"].min()).dt.days.to_numpy(dtype=float) / 365.25
+    centered_years = years - years.mean()
+    year_variance = (centered_years ** 2).sum()
+    pattern_years = np.bincount(pattern_of, weights=centered_years, minlength=len(patterns))
+
+    block = max(1, SWEEP_BLOCK_CELLS // max(len(patterns), 1))
+    rows = []
+    next_ranks = None
+    # Walk blocks from the end so each block can correlate its last row with the following one
+    for start in reversed(range(0, len(params), block)):
+        scores = np.einsum("pg,ug->pu", sweep_weights(family, params[start:start + block], grades), patterns)
+        means = scores @ sessions / total
+        variance = (scores ** 2) @ sessions / total - means ** 2
+        ranks = _weighted_ranks(scores, sessions)
+        following = np.vstack([ranks[1:], next_ranks]) if next_ranks is not None else ranks[1:]
+        rank_vs_next = np.full(len(ranks), np.nan)
+        rank_vs_next[:len(following)] = _weighted_correlation(ranks[:len(following)], following, sessions)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slopes = scores @ pattern_years / year_variance
+            rows.append(pd.DataFrame({
+                "slope_per_year": slopes,
+                "relative_slope": slopes / means,
+                "variance": variance,
+                "cv": np.sqrt(np.maximum(variance, 0)) / means,
+                "rank_vs_reference": _weighted_correlation(ranks, np.broadcast_to(reference_ranks, ranks.shape), sessions),
+                "rank_vs_next": rank_vs_next,
+            }, index=pd.Index(params[start:start + block], name=family)))
+        next_ranks = ranks[:1]
+    return pd.concat(rows[::-1])
+
+
+def total_climbs(data):
+    """Total completed climbs for each grade"""
+    return data[completed_columns(data)].sum()
+
+
+def weekly_climbs(data):
+    """Completed climbs per grade for each calendar week that had at least one climb"""
+    # Use pd.Grouper to properly group by week, accounting for different years
+    weekly = data.set_index("Dates").groupby(pd.Grouper(freq="W"))[completed_columns(data)].sum()
+    return weekly[weekly.sum(axis=1) > 0]
+
+
+def average_climbs_per_week(data):
+    """Average completed climbs per grade over the weeks that had climbs"""
+    return weekly_climbs(data).mean()
+
+
+def total_sessions(data):
+    return data["Dates"].nunique()
+
+
+def monthly_visits(data):
+    """Sessions per calendar month, including months with no visits"""
+    visits = data.set_index("Dates").groupby(pd.Grouper(freq="ME")).size()
+    if visits.empty:
+        return visits
+    # Reindex to include all months, filling missing with 0
+    complete_months = pd.date_range(start=visits.index.min(), end=visits.index.max(), freq="ME")
+    return visits.reindex(complete_months, fill_value=0)
+
+
+# Calendar windows offered for smoothing
+ROLLING_WINDOWS = ["7D", "28D", "90D"]
+
+
+def build_rolling_state(data, columns):
+    """Prefix sums over sessions (sorted by date) for time-windowed rolling stats.
+
+    The state is a dict of the session dates, a (sessions + 1) x columns
+    matrix of running totals and the column names, so every window and every
+    column is answered from one cumulative sum. Use extend_rolling_state to
+    append new sessions without recomputing the history.
+    """
+    dated = data.dropna(subset=["Dates"]).sort_values("Dates", kind="stable")
+    values = dated[columns].to_numpy(dtype=float)
+    prefix = np.zeros((len(values) + 1, len(columns)))
+    np.cumsum(values, axis=0, out=prefix[1:])
+    return {"dates": dated["Dates"].to_numpy(dtype="datetime64[ns]"), "prefix": prefix, "columns": list(columns), "index": dated.index}
+
+
+def extend_rolling_state(state, new_rows):
+    """Append sessions dated on or after the last known session to a rolling state"""
+    dated = new_rows.dropna(subset=["Dates"]).sort_values("Dates", kind="stable")
+    dates = dated["Dates"].to_numpy(dtype="datetime64[ns]")
+    if len(state["dates"]) and len(dates) and dates[0] < state["dates"][-1]:
+        raise ValueError("extend_rolling_state only appends; rebuild the state for back-dated sessions")
+    values = dated[state["columns"]].to_numpy(dtype=float)
+    prefix = state["prefix"][-1] + np.cumsum(values, axis=0)
+    return {
+        "dates": np.concatenate([state["dates"], dates]),
+        "prefix": np.vstack([state["prefix"], prefix]),
+        "columns": state["columns"],
+        "index": state["index"].append(dated.index),
+    }
+
+
+def rolling_window(state, window, stat="daily"):
+    """Rolling stats over the calendar window ending at each session's date (inclusive).
+
+    Sessions on the same date share one window, so they all get the same value.
+
+    stat="daily" divides the window total by its length in days, so a layoff
+    pulls the value down; stat="session" averages over the sessions in the window.
+    """
+    dates = state["dates"]
+    span = pd.Timedelta(window).to_timedelta64()
+    # Sessions inside each window (dates - span, date], including later sessions on the same date
+    start = np.searchsorted(dates, dates - span, side="right")
+    end = np.searchsorted(dates, dates, side="right")
+    totals = state["prefix"][end] - state["prefix"][start]
+    if stat == "daily":
+        result = totals / (span / np.timedelta64(1, "D"))
+    elif stat == "session":
+        result = totals / (end - start)[:, None]
+    else:
+        raise ValueError(f"Unknown rolling stat: {stat}")
+    return pd.DataFrame(result, index=state["index"], columns=state["columns"])
+
+
+def ewm_load(data, column, acute_days=7, chronic_days=28):
+    """Exponentially weighted acute and chronic daily load, with their ratio"""
+    daily = data.dropna(subset=["Dates"]).set_index("Dates")[column].resample("D").sum()
+    acute = daily.ewm(span=acute_days, adjust=False).mean()
+    chronic = daily.ewm(span=chronic_days, adjust=False).mean()
+    return pd.DataFrame({"Acute": acute, "Chronic": chronic, "Ratio": acute / chronic.where(chronic > 0)})
+
+
+def record_indices(values):
+    """Positions where a series sets a new personal best (strictly above every earlier value)"""
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.array([], dtype=np.int64)
+    previous_best = np.concatenate([[-np.inf], np.fmax.accumulate(values)[:-1]])
+    return np.flatnonzero(values > previous_best)
+
+
+def downsample_indices(values, target, keep=None):
+    """Positions to plot so a long series keeps its shape in roughly target points.
+
+    Min/max bucketing: the series is split into target/2 equal buckets and the
+    lowest and highest point of each bucket are kept, along with the first and
+    last point and any positions in keep (such as personal-best days).
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    keep = np.asarray([] if keep is None else keep, dtype=np.int64)
+    if n <= target:
+        return np.arange(n)
+
+    buckets = max(int(target) // 2, 1)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+    # Sort by value within each bucket; buckets keep their positions, so the
+    # first and last entry of each bucket's range are its min and max
+    order = np.lexsort((np.nan_to_num(values, nan=-np.inf), bucket))
+    minima = order[edges[:-1]]
+    maxima = order[edges[1:] - 1]
+    return np.unique(np.concatenate([[0, n - 1], minima, maxima, keep]))
+
+
+# Bar-chart time bins by history length: (max span, pandas frequency, label, bar width in days)
+TIME_BINS = [
+    (pd.Timedelta(days=92), "D", "day", 0.8),
+    (pd.Timedelta(days=730), "W", "week", 5.6),
+    (None, "MS", "month", 24.0),
+]
+
+
+def choose_time_bin(dates):
+    """Pick day, week or month bins from the span of the data so bar counts stay bounded"""
+    dates = dates.dropna()
+    span = dates.max() - dates.min() if len(dates) else pd.Timedelta(0)
+    for max_span, freq, label, width in TIME_BINS:
+        if max_span is None or span <= max_span:
+            return freq, label, width
+
+
+def binned_grade_counts(data, freq):
+    """Completed and tried counts per grade summed over time bins of the given frequency"""
+    columns = completed_columns(data) + tried_columns(data)
+    dated = data.dropna(subset=["Dates"]).set_index("Dates")[columns]
+    return dated.resample(freq).sum()
+
+
+# Period granularities materialized in the rollup cube
+ROLLUP_PERIODS = {"week": "W", "month": "ME"}
+
+
+def build_rollup_cube(data, method_scores=None):
+    """Materialize sessions, completed/tried counts and method scores per location per week and month.
+
+    Returns {"week": frame, "month": frame}, each indexed by (period end, Location),
+    so totals, weekly averages, monthly visits and per-gym breakdowns are cheap slices.
+    """
+    measures = data[["Dates", "Location"] + completed_columns(data) + tried_columns(data)]
+    if method_scores is not None:
+        measures = measures.join(method_scores.loc[data.index])
+    measures = measures.dropna(subset=["Dates"]).assign(Sessions=1)
+    return {
+        period: measures.groupby([pd.Grouper(key="Dates", freq=freq), "Location"], observed=True, dropna=False).sum()
+        for period, freq in ROLLUP_PERIODS.items()
+    }
+
+
+def extend_rollup_cube(cube, new_rows, method_scores=None):
+    """Add newly appended sessions to an existing cube; every measure is additive"""
+    added = build_rollup_cube(new_rows, method_scores)
+    # add() with fill_value goes through float; cast back so an extended cube matches a freshly built one
+    return {
+        period: cube[period].add(added[period], fill_value=0).astype(cube[period].dtypes).sort_index()
+        for period in cube
+    }
+
+
+def rollup_slice(cube, period, locations=None):
+    """Per-period totals from the cube, optionally restricted to some locations"""
+    frame = cube[period]
+    if locations:
+        frame = frame[frame.index.get_level_values("Location").isin(locations)]
+    return frame.groupby(level="Dates").sum()
+
+
+def rollup_average_per_week(cube, columns, locations=None):
+    """Average of columns per week, over the weeks that had at least one climb"""
+    weekly = rollup_slice(cube, "week", locations)[columns]
+    return weekly[weekly.sum(axis=1) > 0].mean()
+
+
+def rollup_monthly_visits(cube, locations=None):
+    """Sessions per month, including months with no visits"""
+    visits = rollup_slice(cube, "month", locations)["Sessions"]
+    if visits.empty:
+        return visits
+    complete_months = pd.date_range(start=visits.index.min(), end=visits.index.max(), freq="ME")
+    return visits.reindex(complete_months, fill_value=0).astype(int)
+
+
+def rollup_by_location(cube, columns):
+    """Totals of columns for each location across all time"""
+    return cube["month"].groupby(level="Location", observed=True, dropna=False)[columns].sum()
+
+
+def location_visits(data):
+    """Visit counts for each (already normalized) location key"""
+    counts = data["Location"].value_counts()
+    return {location: int(count) for location, count in counts.items() if count > 0}
+
+
+REPORTS = {
+    "scores": lambda data: pd.concat([data[["Location", "Dates"]], score_methods(data)], axis=1),
+    "totals": lambda data: total_climbs(data).rename("Total Climbs").to_frame(),
+    "weekly": lambda data: average_climbs_per_week(data).rename("Average Climbs per Week").to_frame(),
+    "monthly": lambda data: monthly_visits(data).rename("Visits").rename_axis("Month").to_frame(),
+    "locations": lambda data: pd.Series(location_visits(data), name="Visits").rename_axis("Location").to_frame(),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score climbing logs and print or write aggregates")
+    parser.add_argument("sources", nargs="+", help="CSV paths or sheet export URLs")
+    parser.add_argument("--report", choices=list(REPORTS) + ["all"], default="scores", help="what to output (default: scores)")
+    parser.add_argument("--output-dir", help="write <log>_<report>.csv files here instead of printing")
+    parser.add_argument("--no-store", action="store_true", help="always re-ingest instead of using the session store")
+    parser.add_argument("--first-year", type=int,
+                        help="year of the first row of year-less logs (default: the log's first_year in datasets.json)")
+    args = parser.parse_args(argv)
+
+    # Loading pulls in pyarrow for the session store, so it's only imported when scoring
+    from chalktopus_datasets import first_year_for
+    from chalktopus_store import load_sessions
+
+    reports = list(REPORTS) if args.report == "all" else [args.report]
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    for source in args.sources:
+        first_year = args.first_year if args.first_year is not None else first_year_for(source)
+        data = load_sessions(source, use_store=not args.no_store, first_year=first_year).sort_values("Dates")
+        unparsed_dates = int(data["Dates"].isna().sum())
+        if unparsed_dates:
+            print(f"warning: {source}: {unparsed_dates} rows have a date that couldn't be parsed", file=sys.stderr)
+        for report in reports:
+            table = REPORTS[report](data)
+            if args.output_dir:
+                name = os.path.splitext(os.path.basename(source.split("?")[0]))[0] or "sheet"
+                table.to_csv(os.path.join(args.output_dir, f"{name}_{report}.csv"))
+            else:
+                if len(args.sources) > 1 or len(reports) > 1:
+                    print(f"# {source}: {report}")
+                table.to_csv(sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
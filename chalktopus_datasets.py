@@ -0,0 +1,222 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import chalktopus_perf as perf
+from chalktopus_snapshot import fetch_csv_snapshot, DEFAULT_TTL
+from chalktopus_store import sessions_from_raw, open_source, store_path_for, STORE_PATH
+
+# Named datasets, one per climber: {"name": {"source": sheet URL or CSV path, "fallback": CSV path,
+# "first_year": year of the first row, for logs whose dates have no year}}
+DATASETS_PATH = os.environ.get("CHALKTOPUS_DATASETS", "datasets.json")
+
+# Used when there is no datasets.json, matching the single-climber dashboard
+DEFAULT_DATASET = "default"
+DEFAULT_DATASETS = {
+    DEFAULT_DATASET: {
+        "source": "https://docs.google.com/spreadsheets/d/15r0qE2WNQYk2CLqxnI7b5r9_OWyaOMFAtb_4t8_ylnA/edit?usp=sharing",
+        "fallback": "20250212_rockclimbing.csv",
+    },
+    # The bundled year-less log starts in 2023; pinned so its dates don't follow the checkout's mtime
+    "central rock": {"source": "Rock Climbing - central rock.csv", "first_year": 2023},
+}
+
+# Upper bound on the parsed sessions and aggregates kept for all datasets together
+MAX_CACHE_BYTES = int(float(os.environ.get("CHALKTOPUS_DATASET_CACHE_MB", 512)) * 1024 * 1024)
+
+# Cached values keyed by (dataset, kind, version), least recently used first
+_entries = OrderedDict()
+_cache_bytes = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+# One lock per key being built, so concurrent sessions wait for a single build instead of each doing it
+_builders = {}
+
+# Last version check of each dataset's source
+_sources = {}
+
+_lock = threading.Lock()
+
+
+def load_datasets(path=DATASETS_PATH):
+    """Dataset specs from datasets.json, or the single default sheet if it can't be read"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return DEFAULT_DATASETS
+
+
+def first_year_for(source, datasets=None):
+    """first_year setting of the dataset read from source (its sheet, CSV or fallback), if any"""
+    for spec in (datasets or load_datasets()).values():
+        if source in (spec["source"], export_url(spec["source"]), spec.get("fallback")):
+            return spec.get("first_year")
+    return None
+
+
+def export_url(source):
+    """CSV export URL for a Google Sheets link; other sources are returned unchanged"""
+    if "spreadsheets/d/" in source:
+        sheet_id = source.split("spreadsheets/d/")[1].split("/")[0]
+        return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
+    return source
+
+
+def sizeof(value):
+    """Approximate bytes held by a cached value (frames, arrays and containers of them)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(sizeof(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _drop(key):
+    global _cache_bytes
+    _, size = _entries.pop(key)
+    _cache_bytes -= size
+
+
+def cached(dataset, kind, version, build):
+    """Return the value for (dataset, kind, version), calling build() only if no session has built it yet.
+
+    Values are shared by every browser session, so callers must not modify
+    them. Storing a new version drops the older versions of the same dataset
+    and kind; past the memory budget the least recently used values go first.
+    """
+    key = (dataset, kind, version)
+    with _lock:
+        if key in _entries:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return _entries[key][0]
+        builder = _builders.setdefault(key, threading.Lock())
+
+    with builder:
+        with _lock:
+            if key in _entries:
+                # Another session built it while this one waited
+                _entries.move_to_end(key)
+                _stats["hits"] += 1
+                return _entries[key][0]
+            _stats["misses"] += 1
+
+        value = build()
+        size = sizeof(value)
+
+        global _cache_bytes
+        with _lock:
+            for old_key in [k for k in _entries if k[:2] == key[:2]]:
+                _drop(old_key)
+            _entries[key] = (value, size)
+            _cache_bytes += size
+            while _cache_bytes > MAX_CACHE_BYTES and len(_entries) > 1:
+                _drop(next(iter(_entries)))
+                _stats["evictions"] += 1
+            _builders.pop(key, None)
+    return value
+
+
+def invalidate(dataset=None):
+    """Drop cached values for one dataset (or all of them) and recheck its source on next load"""
+    with _lock:
+        for key in [k for k in _entries if dataset is None or k[0] == dataset]:
+            _drop(key)
+        if dataset is None:
+            _sources.clear()
+        else:
+            _sources.pop(dataset, None)
+
+
+def cache_info():
+    """Entry count, size and hit/miss counters, with bytes per dataset"""
+    with _lock:
+        per_dataset = {}
+        for (dataset, _, _), (_, size) in _entries.items():
+            per_dataset[dataset] = per_dataset.get(dataset, 0) + size
+        return dict(_stats, entries=len(_entries), bytes=_cache_bytes, max_bytes=MAX_CACHE_BYTES, datasets=per_dataset)
+
+
+def _fetch(spec, refresh=False):
+    """Version a dataset's raw log, returning (read, sha256, info); read() parses it (see open_source)"""
+    source = export_url(spec["source"])
+    if not source.startswith(("http://", "https://")):
+        read, sha256, anchor = open_source(source)
+        stat = os.stat(source)
+        return read, sha256, {"status": "file", "source": source, "fetched_at": time.time(), "anchor": anchor,
+                             "stat": (stat.st_mtime_ns, stat.st_size)}
+    try:
+        raw, snapshot = fetch_csv_snapshot(source, ttl=0 if refresh else DEFAULT_TTL)
+        anchor = pd.Timestamp(snapshot.get("changed_at", snapshot["fetched_at"]), unit="s")
+        return lambda: raw, snapshot["sha256"], dict(snapshot, source=source, anchor=anchor)
+    except Exception as e:
+        if not spec.get("fallback"):
+            raise
+        read, sha256, anchor = open_source(spec["fallback"])
+        return read, sha256, {"status": "fallback", "source": spec["fallback"], "fetched_at": time.time(), "anchor": anchor, "error": str(e)}
+
+
+def _source_unchanged(checked, refresh):
+    """Whether the last check of a source can be trusted without reading it again"""
+    if checked is None or refresh:
+        return False
+    info = checked["info"]
+    if info["status"] == "file":
+        try:
+            stat = os.stat(info["source"])
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == info["stat"]
+    # Sheets, and the fallback used while a sheet can't be reached, are rechecked once the snapshot TTL is up
+    return time.time() - checked["checked_at"] < DEFAULT_TTL
+
+
+def load_dataset(name, refresh=False, datasets=None):
+    """Typed sessions for a named dataset and a dict describing where they came from.
+
+    Within the snapshot TTL (or while a local file is untouched) the source
+    isn't read at all and every session gets the same shared frame. The dict
+    has the source "status", the content "version" (sha256), whether the
+    sessions came from the shared cache and, when they were just built, the
+    ingest stats.
+    """
+    spec = (datasets or load_datasets())[name]
+    with _lock:
+        checked = _sources.get(name)
+
+    read = None
+    if _source_unchanged(checked, refresh):
+        version, info = checked["version"], checked["info"]
+    else:
+        read, version, info = _fetch(spec, refresh)
+        with _lock:
+            _sources[name] = {"version": version, "info": info, "checked_at": time.time()}
+
+    built = {}
+
+    def build():
+        # The default dataset keeps the store that `chalktopus_store build` writes
+        path = STORE_PATH if name == DEFAULT_DATASET else store_path_for(spec["source"])
+        with perf.stage("ingest") as timing:
+            sessions, built["ingest_stats"] = sessions_from_raw(
+                read or _fetch(spec)[0], version, source=name, path=path, first_year=spec.get("first_year"), anchor=info.get("anchor")
+            )
+            timing["cached"] = built["ingest_stats"] is None
+            timing["rows"] = len(sessions)
+        return sessions
+
+    sessions = cached(name, "sessions", version, build)
+    return sessions, dict(info, dataset=name, version=version, shared="ingest_stats" not in built, ingest_stats=built.get("ingest_stats"))
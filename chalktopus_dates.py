@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Date layouts seen in climbing logs, tried in order; earlier entries win ties.
+# Year-less layouts ("30 April", "9Jul") get their years from row order.
+DATE_FORMATS = [
+    ("%m/%d/%Y", True),
+    ("%m/%d/%y", True),
+    ("%Y-%m-%d", True),
+    ("%d/%m/%Y", True),
+    ("%d %b %Y", True),
+    ("%b %d %Y", True),
+    ("%d %b", False),
+    ("%b %d", False),
+    ("%m/%d", False),
+]
+
+# A year-less date this many days earlier than the row before it starts a new year
+ROLLOVER_DAYS = 182
+
+# Year of the first row of every year-less log; per-source first_year settings take precedence
+FIRST_YEAR = int(os.environ["CHALKTOPUS_FIRST_YEAR"]) if os.environ.get("CHALKTOPUS_FIRST_YEAR") else None
+
+# How many distinct values are looked at to pick a format
+DETECT_SAMPLE = 1000
+
+# Detected format for each source, so it is only worked out once
+_date_formats = {}
+
+
+def clean_dates(values):
+    """Lowercase, split "9jul" into "9 jul", shorten month names to three letters and drop commas"""
+    text = values.astype("string").str.strip().str.lower()
+    text = text.str.replace(",", " ", regex=False)
+    text = text.str.replace(r"(?<=\d)(?=[a-z])|(?<=[a-z])(?=\d)", " ", regex=True)
+    text = text.str.replace(r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?", r"\1", regex=True)
+    return text.str.replace(r"\s+", " ", regex=True)
+
+
+def _parse_with(text, fmt, has_year):
+    # Year-less dates are parsed in a leap year so 29 Feb survives until the real year is known
+    if not has_year:
+        text, fmt = "2000 " + text, "%Y " + fmt
+    return pd.to_datetime(text, format=fmt, errors="coerce")
+
+
+def detect_date_format(text):
+    """The (format, has_year) pair that parses the most of a sample of cleaned dates, or None"""
+    sample = pd.Series(text.dropna().unique()[:DETECT_SAMPLE], dtype="string")
+    if sample.empty:
+        return None
+    counts = [_parse_with(sample, fmt, has_year).notna().sum() for fmt, has_year in DATE_FORMATS]
+    best = int(np.argmax(counts))
+    return DATE_FORMATS[best] if counts[best] else None
+
+
+def _infer_years(month_day, first_year=None, anchor=None):
+    """Attach years to dates parsed in year 2000, assuming the rows are in date order.
+
+    Each big step backwards (31 Dec -> 2 Jan) starts a new year. Without a
+    first_year, the last row is put in the latest year that isn't after the
+    anchor date (such as the log file's modification time). Returns the dates
+    and the year of the first row.
+    """
+    day_number = (month_day - pd.Timestamp("2000-01-01")).dt.days
+    previous = day_number.ffill().shift(1)
+    rollovers = (day_number < previous - ROLLOVER_DAYS).cumsum().to_numpy()
+
+    known = month_day.dropna()
+    if known.empty:
+        return month_day, None
+    if first_year is None:
+        if anchor is None:
+            # Falling back to today would give the same log different years depending on when it was read
+            raise ValueError("year-less dates need a first_year or an anchor date")
+        anchor = pd.Timestamp(anchor)
+        last = known.iloc[-1]
+        last_year = anchor.year if (last.month, last.day) <= (anchor.month, anchor.day) else anchor.year - 1
+        first_year = last_year - rollovers[-1]
+
+    months = month_day.dt.month.to_numpy(dtype=float)
+    days = month_day.dt.day.to_numpy(dtype=float)
+    valid = ~np.isnan(months)
+    month_start = np.zeros(len(month_day), dtype="datetime64[M]")
+    month_start[valid] = ((first_year + rollovers[valid] - 1970) * 12 + months[valid] - 1).astype("int64")
+    dates = month_start.astype("datetime64[ns]") + (np.nan_to_num(days) - 1).astype("timedelta64[D]")
+    # 29 Feb outside a leap year spills into March
+    dates[~valid | (dates.astype("datetime64[M]") != month_start)] = np.datetime64("NaT")
+    return pd.Series(dates, index=month_day.index), int(first_year)
+
+
+def forget_formats(source=None):
+    """Drop the detected date format of one source (or all), so the next parse detects it again"""
+    if source is None:
+        _date_formats.clear()
+    else:
+        _date_formats.pop(source, None)
+
+
+def parse_dates(values, source="default", first_year=None, anchor=None):
+    """Parse a column of log dates with one explicit format per source.
+
+    Returns (dates, info) where info has the "format" used, whether years were
+    "inferred", the "first_year" given to a year-less log and an "unparsed"
+    mask of the rows left as NaT. Only distinct values are cleaned and parsed.
+    Year-less logs need first_year (the year of the first row, defaulting to
+    CHALKTOPUS_FIRST_YEAR) or an anchor date no earlier than the last row.
+    """
+    first_year = FIRST_YEAR if first_year is None else first_year
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    text = clean_dates(pd.Series(uniques, dtype=object))
+
+    date_format = _date_formats.get(source)
+    # Re-detect if the log's layout has changed since the format was cached
+    if date_format is None or _parse_with(text, *date_format).notna().mean() < 0.5:
+        date_format = detect_date_format(text)
+        _date_formats[source] = date_format
+
+    inferred_year = None
+    if date_format is None:
+        dates = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    else:
+        parsed = _parse_with(text, *date_format).to_numpy(dtype="datetime64[ns]")
+        dates = pd.Series(np.append(parsed, np.datetime64("NaT"))[codes], index=values.index)
+        if not date_format[1]:
+            dates, inferred_year = _infer_years(dates, first_year, anchor)
+
+    info = {
+        "format": date_format[0] if date_format else None,
+        "inferred": bool(date_format and not date_format[1]),
+        "first_year": inferred_year,
+        "unparsed": dates.isna(),
+    }
+    return dates.rename(values.name), info
@@ -0,0 +1,336 @@
+"""Static export of the dashboard for readers who don't need live reruns.
+
+    python chalktopus_export.py -o site
+    python chalktopus_export.py alice -o site/alice
+    python chalktopus_export.py --source 20250212_rockclimbing.csv -o site
+
+Runs the pipeline once and writes HTML pages, PNG charts, the folium map and
+CSV/JSON copies of the tables for every scoring method and grade. A manifest
+records a fingerprint of each file's inputs, so exporting again only
+re-renders the files whose inputs changed. Charts render in the worker
+pool from chalktopus_render while the tables and pages are written.
+"""
+import argparse
+import html
+import json
+import os
+import re
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+import chalktopus_core as core
+import chalktopus_datasets as datasets
+from chalktopus_calendar import calendar_grid, color_limits, draw_year
+from chalktopus_figcache import fingerprint
+from chalktopus_geo import get_gym_index, region_rollup
+from chalktopus_locations import load_locations, locations_version
+from chalktopus_map import map_html
+from chalktopus_render import draw_bars, draw_difficulty, draw_monthly_visits, draw_pie, draw_smoothed, draw_trend, submit
+
+# Bump when chart drawing or the bundle layout changes, so every file is written again
+EXPORT_VERSION = "3"
+
+MANIFEST_NAME = "manifest.json"
+
+# Same defaults as the dashboard's sidebar
+MAX_PLOT_POINTS = 1000
+SMOOTHING_WINDOWS = ["7D", "28D"]
+
+_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title} - chalktopus</title>
+<style>
+body {{ font-family: sans-serif; max-width: 1100px; margin: 0 auto; padding: 1em; }}
+nav a {{ margin-right: 1em; }}
+img {{ max-width: 100%; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ccc; padding: 0.2em 0.5em; text-align: right; }}
+</style>
+</head>
+<body>
+<nav><a href="index.html">Overview</a><a href="macro.html">Macro Data</a><a href="locations.html">Map</a><a href="difficulty.html">Difficulty Graphs</a><a href="data.html">Data</a></nav>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-")
+
+
+# The bundle: output directory, the previous manifest and the one being written
+
+def open_bundle(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    old = previous.get("files", {}) if previous.get("version") == EXPORT_VERSION else {}
+    return {"dir": out_dir, "old": old, "files": {}, "written": [], "skipped": 0, "rendering": {}, "failed": {}}
+
+
+def _unchanged(bundle, relpath, inputs, options):
+    """Record relpath in the new manifest; True if the previous export already wrote it from the same inputs"""
+    key = fingerprint(inputs, options)
+    bundle["files"][relpath] = key
+    if bundle["old"].get(relpath) == key and os.path.exists(os.path.join(bundle["dir"], relpath)):
+        bundle["skipped"] += 1
+        return True
+    return False
+
+
+def _save(bundle, relpath, payload):
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    path = os.path.join(bundle["dir"], relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    bundle["written"].append(relpath)
+
+
+def write_file(bundle, relpath, inputs, options, produce):
+    """Write produce()'s bytes or text to relpath unless the manifest shows the same inputs were exported"""
+    if not _unchanged(bundle, relpath, inputs, options):
+        _save(bundle, relpath, produce())
+
+
+def write_chart(bundle, relpath, inputs, options, chart, prepare):
+    """Queue chart(*prepare()) for rendering unless unchanged; close_bundle writes it when it's done"""
+    if not _unchanged(bundle, relpath, inputs, options):
+        bundle["rendering"][submit(chart, *prepare())] = relpath
+
+
+def write_table(bundle, name, table):
+    """CSV and JSON copies of a table under tables/"""
+    frame = table.to_frame() if isinstance(table, pd.Series) else table
+    write_file(bundle, f"tables/{name}.csv", [frame], {}, lambda: frame.to_csv())
+    write_file(bundle, f"tables/{name}.json", [frame], {}, lambda: frame.reset_index().to_json(orient="records", date_format="iso", indent=1))
+
+
+def write_page(bundle, relpath, title, body):
+    page = _PAGE.format(title=html.escape(title), body=body)
+    write_file(bundle, relpath, [page], {}, lambda: page)
+
+
+def close_bundle(bundle):
+    """Write charts as their renders finish, remove files the previous export wrote but this one didn't, then save the manifest.
+
+    A chart that fails to render is listed under "failed" in the manifest
+    with its error and left out of "files", so the next export tries it
+    again; whatever the previous export wrote there is kept meanwhile.
+    """
+    for future in as_completed(bundle["rendering"]):
+        relpath = bundle["rendering"][future]
+        try:
+            payload = future.result()
+        except Exception as e:
+            bundle["failed"][relpath] = f"{type(e).__name__}: {e}"
+            del bundle["files"][relpath]
+            continue
+        _save(bundle, relpath, payload)
+    removed = set(bundle["old"]) - set(bundle["files"]) - set(bundle["failed"])
+    for relpath in removed:
+        try:
+            os.remove(os.path.join(bundle["dir"], relpath))
+        except OSError:
+            pass
+    with open(os.path.join(bundle["dir"], MANIFEST_NAME), "w") as f:
+        json.dump({"version": EXPORT_VERSION, "files": bundle["files"], "failed": bundle["failed"]}, f, indent=1, sort_keys=True)
+    return {"written": len(bundle["written"]), "skipped": bundle["skipped"], "removed": len(removed), "failed": bundle["failed"]}
+
+
+# Chart inputs, prepared the way the dashboard prepares them
+
+def downsampled(frame, column, max_points=MAX_PLOT_POINTS):
+    values = frame[column].to_numpy(dtype=float)
+    return frame.iloc[core.downsample_indices(values, max_points, keep=core.record_indices(values))]
+
+
+def smoothed_points(smoothed, window):
+    """(Dates, Value) points of one rolling window, as draw_smoothed takes them"""
+    points = downsampled(smoothed.dropna(subset=[window]), window)
+    return points[["Dates", window]].rename(columns={window: "Value"})
+
+
+def _img(relpath, alt):
+    return f'<img src="{relpath}" alt="{html.escape(alt)}">'
+
+
+def _table(frame):
+    return frame.to_html(float_format=lambda value: f"{value:.2f}", border=0)
+
+
+# Views
+
+def export_variant(bundle, data, name, column, title, ylabel):
+    """Heatmap, trend, smoothed trend and load charts for one scoring method or grade"""
+    series = data[["Dates"]].assign(Value=data[column]).dropna().sort_values("Dates")
+    series = series[np.isfinite(series["Value"])]
+    sections = []
+
+    # One image per year, so a new session only re-renders its own year (unless it sets a new high)
+    years, grid, in_year = calendar_grid(series["Dates"], series["Value"])
+    vmin, vmax = color_limits(grid)
+    panels = []
+    for i, year in enumerate(years):
+        relpath = f"img/{name}-calendar-{year}.png"
+        write_chart(bundle, relpath, [grid[i].tobytes(), in_year[i].tobytes()], {"vmin": vmin, "vmax": vmax},
+                    draw_year, lambda i=i, year=year: (grid[i], in_year[i], year, vmin, vmax))
+        panels.append(_img(relpath, f"{title} {year}"))
+    if panels:
+        sections.append("<h2>Calendar Heatmap</h2>" + "".join(panels))
+
+    write_chart(bundle, f"img/{name}-trend.png", [series], {"title": title},
+                draw_trend, lambda: (downsampled(series, "Value"), "Value", title, ylabel))
+    sections.append(f"<h2>{html.escape(title)} Trend</h2>{_img(f'img/{name}-trend.png', title)}")
+
+    rolling_state = core.build_rolling_state(data, [column])
+    rolled = {window: core.rolling_window(rolling_state, window)[column] for window in SMOOTHING_WINDOWS}
+    smoothed = pd.DataFrame({"Dates": data["Dates"], **rolled}).dropna(subset=["Dates"]).sort_values("Dates")
+    write_chart(bundle, f"img/{name}-smoothed.png", [smoothed], {"title": title},
+                draw_smoothed, lambda: (
+                    {window: smoothed_points(smoothed, window) for window in SMOOTHING_WINDOWS},
+                    f"Smoothed {title}",
+                    f"Smoothed {ylabel} per Day",
+                ))
+    sections.append(f"<h2>Smoothed Trend</h2>{_img(f'img/{name}-smoothed.png', title)}")
+
+    write_table(bundle, f"{name}-ewm-load", core.ewm_load(data, column))
+    write_page(bundle, f"{name}.html", title, "\n".join(sections)
+               + f'<p><a href="tables/{name}-ewm-load.csv">Acute/chronic load (CSV)</a></p>')
+
+
+def export_macro(bundle, data, method_scores, cube):
+    completed = core.completed_columns(data)
+    total_climbs = core.rollup_slice(cube, "week")[completed].sum()
+    average_per_week = core.rollup_average_per_week(cube, completed)
+    breakdown = core.rollup_by_location(cube, ["Sessions"] + completed + list(method_scores.columns))
+    monthly_visits = core.rollup_monthly_visits(cube)
+    for name, table in [("total_climbs", total_climbs), ("average_climbs_per_week", average_per_week),
+                        ("location_breakdown", breakdown), ("monthly_visits", monthly_visits)]:
+        write_table(bundle, name, table)
+
+    write_chart(bundle, "img/total-climbs.png", [total_climbs], {},
+                draw_bars, lambda: (total_climbs, "Grade", "Total Climbs", "Total Climbs for Each Grade"))
+    write_chart(bundle, "img/average-climbs-per-week.png", [average_per_week], {},
+                draw_bars, lambda: (average_per_week, "Grade", "Average Climbs per Week", "Average Climbs per Week for Each Grade"))
+    body = [
+        f"<h2>Total Climbs</h2>{_table(total_climbs.to_frame('Climbs'))}{_img('img/total-climbs.png', 'Total climbs')}",
+        f"<h2>Average Climbs per Week</h2>{_table(average_per_week.to_frame('Per Week'))}{_img('img/average-climbs-per-week.png', 'Average climbs per week')}",
+        f"<h2>Total Climbing Sessions</h2><p>Total Climbing Sessions: {core.total_sessions(data)}</p>",
+        f"<h2>Breakdown by Location</h2>{_table(breakdown)}",
+    ]
+    if not monthly_visits.empty:
+        write_chart(bundle, "img/monthly-visits.png", [monthly_visits], {}, draw_monthly_visits,
+                    lambda: (downsampled(monthly_visits.rename("Visits").rename_axis("Month").reset_index(), "Visits"),))
+        body.append(f"<h2>Monthly Visits</h2>{_img('img/monthly-visits.png', 'Monthly visits')}")
+    write_page(bundle, "macro.html", "Macro Data", "\n".join(body))
+
+
+def export_locations(bundle, data, locations):
+    visit_counts = core.location_visits(data)
+    body = []
+    if locations:
+        version = locations_version(locations)
+        write_file(bundle, "map.html", [version, sorted(visit_counts.items())], {},
+                   lambda: map_html(locations, visit_counts, version))
+        body.append('<iframe src="map.html" width="100%" height="500" style="border: 0"></iframe>')
+        regions = region_rollup(data, get_gym_index(locations), core.completed_columns(data))
+        write_table(bundle, "regions", regions)
+        body.append(f"<h2>Regions</h2>{_table(regions)}")
+
+    labels = [locations[key]["name"].upper() if key in locations else str(key).upper() for key in visit_counts]
+    counts = list(visit_counts.values())
+    if counts:
+        write_chart(bundle, "img/visit-distribution.png", [labels, counts], {}, draw_pie, lambda: (labels, counts))
+        body.append(f"<h2>Visit Distribution</h2>{_img('img/visit-distribution.png', 'Visit distribution')}")
+    write_page(bundle, "locations.html", "Map", "\n".join(body))
+
+
+def export_difficulty(bundle, data):
+    freq, bin_label, bin_width = core.choose_time_bin(data["Dates"])
+    bins = core.binned_grade_counts(data, freq)
+    grades = core.available_grades(data)
+    body = []
+    if not bins.empty and grades:
+        write_table(bundle, "difficulty_bins", bins)
+        for show_tried in (False, True):
+            relpath = f"img/difficulty{'-tried' if show_tried else ''}.png"
+            write_chart(bundle, relpath, [bins], {"show_tried": show_tried},
+                        draw_difficulty, lambda show_tried=show_tried: (bins, grades, bin_label, bin_width, show_tried))
+            body.append(f"<h2>{'Completed and Tried' if show_tried else 'Completed'}</h2>{_img(relpath, 'Difficulty graphs')}")
+    write_page(bundle, "difficulty.html", "Difficulty Graphs", "\n".join(body))
+
+
+def export_bundle(data, out_dir, locations=None, title="chalktopus"):
+    """Write every view of the dashboard for one log into out_dir and return what was written"""
+    locations = load_locations() if locations is None else locations
+    bundle = open_bundle(out_dir)
+
+    scoring_methods = core.get_scoring_methods()
+    method_scores = core.score_methods(data, scoring_methods)
+    scored = pd.concat([data, method_scores], axis=1)
+    cube = core.build_rollup_cube(data, method_scores)
+
+    variants = []
+    for method in scoring_methods:
+        name = f"method-{slug(method)}"
+        export_variant(bundle, scored, name, method, f"Daily Climbing Scores ({method})", "Daily Score")
+        variants.append((name, method))
+    for grade in core.available_grades(data):
+        name = f"grade-{slug(grade)}"
+        export_variant(bundle, scored, name, f"{grade}_completed", f"Daily {grade.upper()} Completed", f"{grade.upper()} Completed")
+        variants.append((name, f"{grade.upper()} completed"))
+
+    export_macro(bundle, data, method_scores, cube)
+    export_locations(bundle, data, locations)
+    export_difficulty(bundle, data)
+
+    sessions = scored.drop(columns=[col for col in ["Comments"] if col in scored.columns])
+    write_table(bundle, "sessions", sessions.set_index("Dates"))
+    write_table(bundle, "method_summary", method_scores.agg(["sum", "mean", "max"]).T)
+    tables = sorted(path for path in bundle["files"] if path.startswith("tables/"))
+    write_page(bundle, "data.html", "Data", "<ul>" + "".join(f'<li><a href="{path}">{path[7:]}</a></li>' for path in tables) + "</ul>")
+
+    dates = data["Dates"].dropna()
+    span = f"{dates.min():%Y-%m-%d} to {dates.max():%Y-%m-%d}" if len(dates) else "no dated sessions"
+    links = "".join(f'<li><a href="{name}.html">{html.escape(label)}</a></li>' for name, label in variants)
+    write_page(bundle, "index.html", title,
+               f"<p>{len(data)} sessions, {span}.</p><h2>Scoring Methods and Grades</h2><ul>{links}</ul>")
+    return close_bundle(bundle)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the chalktopus dashboard as static files")
+    parser.add_argument("dataset", nargs="?", default=datasets.DEFAULT_DATASET, help="dataset name from datasets.json")
+    parser.add_argument("--source", help="CSV path or sheet URL to export instead of a named dataset")
+    parser.add_argument("-o", "--output", default="site", help="bundle directory (default: site)")
+    args = parser.parse_args(argv)
+
+    if args.source:
+        # Named after the source, so it gets a store of its own instead of the default dataset's
+        name, specs = args.source, {args.source: {"source": args.source}}
+    else:
+        name, specs = args.dataset, datasets.load_datasets()
+    data, info = datasets.load_dataset(name, datasets=specs)
+    if info["status"] in ("stale", "fallback"):
+        print(f"Warning: using {info['source']} ({info['error']})")
+    stats = export_bundle(data, args.output, title=args.dataset if args.dataset != datasets.DEFAULT_DATASET else "chalktopus")
+    print(f"Exported {len(data)} sessions to {args.output}: {stats['written']} files written, "
+          f"{stats['skipped']} unchanged, {stats['removed']} removed")
+    for relpath, error in stats["failed"].items():
+        print(f"Warning: could not render {relpath} ({error})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Upper bound on the rendered bytes kept in memory; least recently used charts go first
+MAX_CACHE_BYTES = int(float(os.environ.get("CHALKTOPUS_FIGURE_CACHE_MB", 64)) * 1024 * 1024)
+
+# Rendered charts keyed by (chart name, input/options fingerprint, format)
+_figures = OrderedDict()
+_cache_bytes = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_lock = threading.Lock()
+
+
+def fingerprint(inputs, options):
+    """Hash chart inputs (pandas objects or plain values) together with display options"""
+    h = hashlib.sha1()
+    for item in inputs:
+        if isinstance(item, (pd.Series, pd.DataFrame, pd.Index)):
+            h.update(pd.util.hash_pandas_object(item, index=not isinstance(item, pd.Index)).to_numpy().tobytes())
+            # Column and series names don't change the hash above but do change the chart
+            names = list(item.columns) if isinstance(item, pd.DataFrame) else [item.name]
+            h.update(repr(names).encode("utf-8"))
+        else:
+            h.update(repr(item).encode("utf-8"))
+    h.update(repr(sorted(options.items())).encode("utf-8"))
+    return h.hexdigest()
+
+
+def figure_bytes(fig, fmt="png", dpi=150):
+    """Rasterize (or serialize, for svg) a matplotlib figure and close it"""
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def figure_key(name, inputs, options, fmt="png"):
+    """Cache key for a chart: its name, a fingerprint of its inputs and options, and the format"""
+    return (name, fingerprint(inputs, options), fmt)
+
+
+def lookup(key):
+    """Cached bytes for a key, or None; counts as a hit or a miss"""
+    with _lock:
+        if key in _figures:
+            _figures.move_to_end(key)
+            _stats["hits"] += 1
+            return _figures[key]
+        _stats["misses"] += 1
+        return None
+
+
+def store(key, payload):
+    """Add rendered bytes under key, evicting least recently used charts past the size limit"""
+    global _cache_bytes
+    with _lock:
+        if key not in _figures:
+            _figures[key] = payload
+            _cache_bytes += len(payload)
+        while _cache_bytes > MAX_CACHE_BYTES and len(_figures) > 1:
+            _, evicted = _figures.popitem(last=False)
+            _cache_bytes -= len(evicted)
+            _stats["evictions"] += 1
+
+
+def cache_info():
+    """Current entry count, size and hit/miss counters"""
+    with _lock:
+        return dict(_stats, entries=len(_figures), bytes=_cache_bytes, max_bytes=MAX_CACHE_BYTES)
+
+
+def clear_cache():
+    global _cache_bytes
+    with _lock:
+        _figures.clear()
+        _cache_bytes = 0
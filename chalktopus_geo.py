@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+from chalktopus_locations import LOCATIONS_PATH, load_locations, locations_version
+from chalktopus_memo import LatestVersion
+
+# Mean Earth radius
+EARTH_RADIUS_KM = 6371.0088
+
+# Gyms closer than this to each other share a region when locations.json doesn't name one
+REGION_LINK_KM = 100.0
+
+# A logged coordinate further than this from every gym isn't assigned to one
+ASSIGN_MAX_KM = 1.0
+
+# Query points compared against the whole registry per block, to bound the distance matrix size
+QUERY_BLOCK = 4096
+
+_indexes = LatestVersion()
+
+
+def unit_vectors(lat, lon):
+    """Points on the unit sphere for latitudes/longitudes in degrees, shape (n, 3)"""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km, broadcasting over array arguments"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _dot_to_km(dot):
+    # The angle between unit vectors is the great-circle distance on the unit sphere
+    return EARTH_RADIUS_KM * np.arccos(np.clip(dot, -1, 1))
+
+
+def _km_to_dot(km):
+    return np.cos(np.minimum(km / EARTH_RADIUS_KM, np.pi))
+
+
+def _link_regions(xyz, link_km):
+    """Label gyms by connected groups where each gym is within link_km of another in its group"""
+    close = xyz @ xyz.T >= _km_to_dot(link_km)
+    labels = np.arange(len(xyz))
+    # Propagate the smallest label through each group until nothing changes
+    while True:
+        spread = np.where(close, labels[None, :], len(xyz)).min(axis=1)
+        if np.array_equal(spread, labels):
+            return labels
+        labels = spread
+
+
+def build_gym_index(locations, link_km=REGION_LINK_KM):
+    """Unit vectors and regions for every gym with coordinates.
+
+    Gyms keep the "region" from locations.json; gyms without one are grouped
+    with nearby gyms and named after the city in the first one's address.
+    """
+    located = {key: loc for key, loc in locations.items() if loc.get("latitude") is not None and loc.get("longitude") is not None}
+    keys = np.array(list(located), dtype=object)
+    lat = np.array([loc["latitude"] for loc in located.values()], dtype=float)
+    lon = np.array([loc["longitude"] for loc in located.values()], dtype=float)
+    xyz = unit_vectors(lat, lon)
+
+    regions = np.array([loc.get("region") for loc in located.values()], dtype=object)
+    unnamed = np.flatnonzero(pd.isna(regions))
+    if len(unnamed):
+        groups = _link_regions(xyz[unnamed], link_km)
+        for group in np.unique(groups):
+            members = unnamed[groups == group]
+            address = located[keys[members[0]]].get("address", "")
+            parts = [part.strip() for part in address.split(",")]
+            regions[members] = parts[-2] if len(parts) >= 2 else keys[members[0]]
+
+    return {"keys": keys, "lat": lat, "lon": lon, "xyz": xyz, "regions": regions, "version": locations_version(locations)}
+
+
+def get_gym_index(locations=None, path=LOCATIONS_PATH):
+    """Gym index for the registry, built once per version of locations.json"""
+    locations = load_locations(path) if locations is None else locations
+    return _indexes.get(path, locations_version(locations), lambda: build_gym_index(locations))
+
+
+def nearest_gyms(index, lat, lon, max_km=None):
+    """Nearest gym key and its distance in km for each query point.
+
+    Points without coordinates, or further than max_km from every gym, get
+    key None and distance NaN.
+    """
+    points = unit_vectors(np.atleast_1d(lat), np.atleast_1d(lon))
+    keys = np.full(len(points), None, dtype=object)
+    distances = np.full(len(points), np.nan)
+    if not len(index["keys"]):
+        return keys, distances
+
+    for start in range(0, len(points), QUERY_BLOCK):
+        block = points[start:start + QUERY_BLOCK]
+        dots = block @ index["xyz"].T
+        best = np.nanargmax(np.nan_to_num(dots, nan=-2), axis=1)
+        keys[start:start + len(block)] = index["keys"][best]
+        distances[start:start + len(block)] = _dot_to_km(dots[np.arange(len(block)), best])
+
+    missing = np.isnan(distances)
+    if max_km is not None:
+        missing |= distances > max_km
+    keys[missing] = None
+    distances[missing] = np.nan
+    return keys, distances
+
+
+def gyms_within(index, lat, lon, radius_km):
+    """Keys of the gyms within radius_km of one point"""
+    dots = index["xyz"] @ unit_vectors([lat], [lon])[0]
+    return list(index["keys"][dots >= _km_to_dot(radius_km)])
+
+
+def sessions_within(data, index, lat, lon, radius_km):
+    """Mask of the sessions logged at a gym within radius_km of a point"""
+    return data["Location"].isin(gyms_within(index, lat, lon, radius_km)).to_numpy()
+
+
+def session_regions(data, index):
+    """Region of each session's gym, NaN for locations that aren't in the registry"""
+    region_of = pd.Series(index["regions"], index=index["keys"])
+    return data["Location"].map(region_of).astype("category")
+
+
+def region_rollup(data, index, columns=()):
+    """Sessions, distinct gyms and summed columns per region"""
+    regions = session_regions(data, index)
+    grouped = data.assign(Region=regions).groupby("Region", observed=True)
+    summary = pd.DataFrame({"Sessions": grouped.size(), "Gyms": grouped["Location"].nunique()})
+    if columns:
+        summary = summary.join(grouped[list(columns)].sum())
+    return summary.sort_values("Sessions", ascending=False)
+
+
+def assign_nearest_gym(locations, lat, lon, index, max_km=ASSIGN_MAX_KM):
+    """Replace locations that aren't registry keys with the gym their coordinates are at.
+
+    Rows whose coordinates are missing or further than max_km from every gym
+    keep their location as logged.
+    """
+    locations = pd.Series(locations)
+    unknown = ~locations.isin(index["keys"]).to_numpy()
+    if not unknown.any():
+        return locations
+    keys, _ = nearest_gyms(index, np.asarray(lat, dtype=float)[unknown], np.asarray(lon, dtype=float)[unknown], max_km)
+    found = pd.notna(keys)
+    assigned = locations.astype(object).to_numpy(copy=True)
+    assigned[np.flatnonzero(unknown)[found]] = keys[found]
+    return pd.Series(assigned, index=locations.index, name=locations.name).astype("category")
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+from chalktopus_core import GRADES, parse_grade_columns
+from chalktopus_dates import forget_formats, parse_dates
+from chalktopus_geo import assign_nearest_gym, get_gym_index
+from chalktopus_locations import resolve_locations
+
+# The last ingest of each source: its raw rows, the processed frame and how its dates were parsed
+_ingest_caches = {}
+
+
+def process_rows(raw):
+    """Resolve locations to gym keys and parse grade cells for a frame of raw rows"""
+    grades = [col for col in GRADES if col in raw.columns]
+    processed = {"Location": resolve_locations(raw["Location"])}
+    if {"Latitude", "Longitude"} <= set(raw.columns):
+        # Spellings nothing matched can still be placed by where they were logged
+        processed["Location"] = assign_nearest_gym(processed["Location"], raw["Latitude"], raw["Longitude"], get_gym_index())
+    completed, tried = parse_grade_columns(raw, grades)
+    for i, col in enumerate(grades):
+        processed[f"{col}_completed"] = completed[:, i]
+        processed[f"{col}_tried"] = tried[:, i]
+    # Built in one go; inserting the columns one at a time costs more than parsing a short tail
+    return pd.DataFrame(processed, index=raw.index)
+
+
+def parse_tail(last_dated, values, source):
+    """Parse the dates of rows that follow last_dated, a (raw value, date) pair, continuing its years"""
+    if last_dated is None:
+        return None
+    last_raw, last_date = last_dated
+    # Year-less dates take their years from row order, so the tail is parsed after the last dated row
+    dates, info = parse_dates(pd.concat([pd.Series([last_raw]), values], ignore_index=True), source=source, first_year=last_date.year)
+    return dates.iloc[1:].set_axis(values.index), info["unparsed"].iloc[1:].set_axis(values.index)
+
+
+def _with_processed(raw, processed, dates):
+    # Processed columns replace the raw ones in place (Location, Dates) or follow them
+    columns = {col: raw[col] for col in raw.columns}
+    columns.update({col: processed[col] for col in processed.columns})
+    columns["Dates"] = dates
+    return pd.DataFrame(columns, index=raw.index)
+
+
+def _same_locations(data, added):
+    """Give both frames one set of Location categories, so concat keeps the column categorical"""
+    categories = data["Location"].cat.categories.union(added["Location"].cat.categories)
+    return [frame.assign(Location=frame["Location"].cat.set_categories(categories)) for frame in (data, added)]
+
+
+def last_dated(raw, dates):
+    """(raw value, date) of the last row with a date, which parse_tail continues from; None if no row has one"""
+    dated = dates.notna().to_numpy().nonzero()[0]
+    return (raw["Dates"].iloc[dated[-1]], dates.iloc[dated[-1]]) if len(dated) else None
+
+
+def clear_cache(source=None):
+    """Forget previous ingests of one source (or all), so the next ingest starts cold"""
+    for key in [k for k in _ingest_caches if source is None or k[0] == source]:
+        del _ingest_caches[key]
+    forget_formats(source)
+
+
+def row_hashes(raw):
+    """Content hash of each raw row, independent of its position"""
+    return pd.util.hash_pandas_object(raw, index=False).to_numpy()
+
+
+def _changed_rows(raw, old):
+    """Mask of the rows of raw that differ from the row at the same position in old (same length)"""
+    changed = np.zeros(len(raw), dtype=bool)
+    for col in raw.columns:
+        new_values, old_values = raw[col].reset_index(drop=True), old[col].reset_index(drop=True)
+        same = new_values.eq(old_values).fillna(False) | (new_values.isna() & old_values.isna())
+        changed |= ~same.to_numpy(dtype=bool)
+    return changed
+
+
+def _match_rows(raw, old):
+    """Position in old of each row of raw with the same content, or -1 for new and edited rows.
+
+    Rows still in their old place, counted from the start or (after rows were
+    inserted or deleted) from the end, are found with column-wise comparisons,
+    which are much cheaper than hashing; only the rest are matched by content
+    hash.
+    """
+    overlap = min(len(raw), len(old))
+    positions = np.full(len(raw), -1)
+    used = np.zeros(len(old), dtype=bool)
+    same = ~_changed_rows(raw.iloc[:overlap], old.iloc[:overlap])
+    positions[:overlap][same] = same.nonzero()[0]
+    used[:overlap] = same
+    if len(raw) != len(old) and overlap:
+        shift = len(old) - len(raw)
+        same = ~_changed_rows(raw.iloc[len(raw) - overlap:], old.iloc[len(old) - overlap:])
+        tail = len(raw) - overlap + same.nonzero()[0]
+        tail = tail[positions[tail] < 0]
+        positions[tail] = tail + shift
+        used[tail + shift] = True
+
+    rows, old_rows = (positions < 0).nonzero()[0], (~used).nonzero()[0]
+    if len(rows) and len(old_rows):
+        old_hashes = pd.Index(row_hashes(old.iloc[old_rows]))
+        unique = ~old_hashes.duplicated(keep="last")
+        found = old_hashes[unique].get_indexer(row_hashes(raw.iloc[rows]))
+        positions[rows] = np.where(found >= 0, old_rows[unique][found], -1)
+    return positions
+
+
+def _take_rows(frame, positions):
+    """frame.iloc[positions], sliced run by run when the positions are mostly consecutive"""
+    breaks = (np.diff(positions) != 1).nonzero()[0] + 1
+    if len(breaks) > 16:
+        return frame.iloc[positions]
+    starts = np.concatenate([[0], breaks])
+    ends = np.concatenate([breaks, [len(positions)]])
+    return pd.concat([frame.iloc[positions[start]:positions[end - 1] + 1] for start, end in zip(starts, ends)])
+
+
+def _appended(cache, raw, source):
+    """Ingest of raw when the cached rows are still its first rows, or None if the tail can't be dated"""
+    reused = len(cache["raw"])
+    if reused == len(raw):
+        # Nothing appended; shallow copy, since with copy-on-write the cached frame can't be changed through it
+        return cache["data"].copy(deep=False), cache["unparsed"]
+    new_rows = raw.iloc[reused:]
+    if cache["inferred"]:
+        tail = parse_tail(cache["last_dated"], new_rows["Dates"], source)
+        if tail is None:
+            return None
+    else:
+        new_dates, info = parse_dates(new_rows["Dates"], source=source)
+        tail = new_dates, info["unparsed"]
+    added = _with_processed(new_rows, process_rows(new_rows), tail[0])
+    return pd.concat(_same_locations(cache["data"], added)), pd.concat([cache["unparsed"], tail[1]])
+
+
+def _edited(cache, raw, source):
+    """Ingest of raw reusing every cached row whose content is unchanged, or None if nothing can be reused.
+
+    Edits, deletions and insertions anywhere only process the rows that
+    differ. Year-less dates depend on the rows before them, so those are
+    parsed again from the first row that isn't in its old place onward.
+    """
+    positions = _match_rows(raw, cache["raw"])
+    matched = positions >= 0
+    if not matched.any():
+        return None
+
+    if matched.all():
+        data = _take_rows(cache["data"], positions).set_axis(raw.index)
+        unparsed = _take_rows(cache["unparsed"], positions).set_axis(raw.index)
+    else:
+        new_rows = raw[~matched]
+        if cache["inferred"]:
+            # Dated below along with every row after the first change
+            new_dates, new_unparsed = pd.Series(pd.NaT, index=new_rows.index, dtype="datetime64[ns]"), None
+        else:
+            new_dates, info = parse_dates(new_rows["Dates"], source=source)
+            new_unparsed = info["unparsed"]
+        added = _with_processed(new_rows, process_rows(new_rows), new_dates)
+        # New rows are appended to the old frame and taken from there along with the kept ones
+        combined = pd.concat(_same_locations(cache["data"], added), ignore_index=True)
+        all_unparsed = pd.concat([cache["unparsed"], new_unparsed if new_unparsed is not None else pd.Series(True, index=new_rows.index)], ignore_index=True)
+        positions[~matched] = len(cache["data"]) + np.arange(len(new_rows))
+        data = _take_rows(combined, positions).set_axis(raw.index)
+        unparsed = _take_rows(all_unparsed, positions).set_axis(raw.index)
+
+    if cache["inferred"]:
+        moved = (positions != np.arange(len(raw))).nonzero()[0]
+        first = moved[0] if len(moved) else len(raw)
+        if first < len(raw):
+            tail = parse_tail(last_dated(raw.iloc[:first], data["Dates"].iloc[:first]), raw["Dates"].iloc[first:], source)
+            if tail is None:
+                return None
+            data = data.assign(Dates=pd.concat([data["Dates"].iloc[:first], tail[0]]))
+            unparsed = pd.concat([unparsed.iloc[:first], tail[1]])
+    return data, unparsed, int(matched.sum())
+
+
+def ingest_rows(raw, source="default", first_year=None, anchor=None):
+    """Process raw log rows, reusing the previous ingest of source for the rows that haven't changed.
+
+    The training log is append-only in practice, so if the rows ingested last
+    time are still the first rows of raw only the rows after them are
+    processed (year-less dates continue from the last dated row). Otherwise
+    rows are matched to the previous ingest by content hash and only new or
+    edited rows are processed. Without a previous ingest every row is, with
+    years counted from first_year or back from the anchor date (see
+    parse_dates). Returns the processed frame and a dict with the number of
+    rows processed and reused, the date format and the rows whose date
+    didn't parse.
+    """
+    # A change in columns or in the pinned first year changes what every row means, so each gets its own cache
+    key = (source, tuple(raw.columns), first_year)
+    cache = _ingest_caches.get(key)
+    result = None
+    if cache is not None:
+        appended = len(raw) >= len(cache["raw"])
+        # Comparing the frames column by column is far cheaper than hashing them
+        if appended and raw.iloc[:len(cache["raw"])].equals(cache["raw"]):
+            result = _appended(cache, raw, source)
+            if result is not None:
+                result += (len(cache["raw"]),)
+        else:
+            result = _edited(cache, raw, source)
+
+    if result is not None:
+        data, unparsed, reused = result
+    else:
+        reused = 0
+        dates, info = parse_dates(raw["Dates"], source=source, first_year=first_year, anchor=anchor)
+        data = _with_processed(raw, process_rows(raw), dates)
+        unparsed = info["unparsed"]
+        cache = {"inferred": info["inferred"], "first_year": info["first_year"], "date_format": info["format"]}
+
+    cache.update(raw=raw, data=data, unparsed=unparsed, last_dated=last_dated(raw, data["Dates"]))
+    _ingest_caches[key] = cache
+
+    stats = {
+        "rows": len(raw),
+        "processed": len(raw) - reused,
+        "reused": reused,
+        "date_format": cache["date_format"],
+        "first_year": cache["first_year"],
+        "unparsed_dates": raw.loc[unparsed.to_numpy(), "Dates"],
+    }
+    return data, stats
@@ -0,0 +1,165 @@
+import io
+import os
+import threading
+import time
+
+import pandas as pd
+
+import chalktopus_core as core
+from chalktopus_dates import parse_dates
+from chalktopus_ingest import last_dated, parse_tail, process_rows
+from chalktopus_store import to_typed_sessions
+
+# Seconds between checks of the watched file
+POLL_SECONDS = float(os.environ.get("CHALKTOPUS_LIVE_POLL", 2))
+
+# An unterminated last line younger than this may still be being written, so it waits
+SETTLE_SECONDS = 1.0
+
+# Bytes just before the read offset that are compared on each poll to notice edits to earlier rows
+CHECK_BYTES = 4096
+
+# Live state for each watched path
+_logs = {}
+_lock = threading.Lock()
+
+
+def _to_sessions(rows, dates):
+    processed = process_rows(rows)
+    processed["Dates"] = dates
+    if "Comments" in rows.columns:
+        processed["Comments"] = rows["Comments"]
+    return to_typed_sessions(processed)
+
+
+def _derive(state, rows):
+    """Parse new raw rows into sessions and fold them into the scores, rolling state and rollup cube"""
+    # Year-less dates take their year from the rows before them, so they continue from the last dated row
+    tail = parse_tail(state["last_dated"], rows["Dates"], state["path"]) if state["inferred"] else None
+    if tail is None:
+        dates = parse_dates(rows["Dates"], source=state["path"], first_year=state["first_year"], anchor=state["anchor"])[0]
+    else:
+        dates = tail[0]
+    added = _to_sessions(rows, dates)
+    added.index = pd.RangeIndex(len(state["sessions"]), len(state["sessions"]) + len(added))
+    added_scores = core.score_methods(added)
+
+    sessions = pd.concat([state["sessions"], added])
+    sessions["Location"] = sessions["Location"].astype("category")
+    scores = pd.concat([state["scores"], added_scores])
+    try:
+        rolling = core.extend_rolling_state(state["rolling"], pd.concat([added, added_scores], axis=1))
+    except ValueError:
+        # A back-dated session lands mid-history; the prefix sums have to be rebuilt
+        rolling = core.build_rolling_state(pd.concat([sessions, scores], axis=1), state["rolling"]["columns"])
+    state.update(
+        last_dated=last_dated(rows, dates) or state["last_dated"],
+        sessions=sessions,
+        scores=scores,
+        rolling=rolling,
+        cube=core.extend_rollup_cube(state["cube"], added, added_scores),
+    )
+
+
+def _load(path, stat):
+    """Read the whole file and build the live state from scratch"""
+    with open(path, "rb") as f:
+        payload = f.read()
+    raw = pd.read_csv(io.BytesIO(payload))
+    state = {
+        "path": path,
+        "columns": list(raw.columns),
+        "offset": len(payload),
+        "inode": stat.st_ino,
+        "mtime": stat.st_mtime,
+        "window": payload[-CHECK_BYTES:],
+        # A last line without a newline can still be extended rather than followed by new rows
+        "open_line": not payload.endswith(b"\n"),
+        "version": 1,
+        "appended": 0,
+        "reloads": 1,
+    }
+    # Year-less dates are dated back from the file's modification time once; later rows keep that first year
+    state["anchor"] = pd.Timestamp(stat.st_mtime, unit="s")
+    dates, info = parse_dates(raw["Dates"], source=path, anchor=state["anchor"])
+    state.update(first_year=info["first_year"], inferred=info["inferred"], last_dated=last_dated(raw, dates))
+    sessions = _to_sessions(raw, dates)
+    scores = core.score_methods(sessions)
+    columns = core.completed_columns(sessions) + list(scores.columns)
+    state.update(
+        sessions=sessions,
+        scores=scores,
+        rolling=core.build_rolling_state(pd.concat([sessions, scores], axis=1), columns),
+        cube=core.build_rollup_cube(sessions, scores),
+    )
+    return state
+
+
+def _read_tail(state, stat):
+    """Rows appended since the last read, or None if the bytes before them changed.
+
+    Only the bytes after the previous offset are read, plus the CHECK_BYTES
+    before it, which must be unchanged. Together with the inode and size
+    checks in poll this catches rewrites, truncation and edits to the last
+    rows read; an in-place edit further back that keeps the file the same
+    size or longer goes unnoticed until the next full load.
+    """
+    window = state["window"]
+    with open(state["path"], "rb") as f:
+        f.seek(state["offset"] - len(window))
+        if f.read(len(window)) != window:
+            return None
+        chunk = f.read()
+    if state["open_line"] and chunk and not chunk.startswith((b"\n", b"\r\n")):
+        return None
+
+    # Hold back a half-written last line until it ends or the file has been quiet for a moment
+    if not chunk.endswith(b"\n") and time.time() - stat.st_mtime < SETTLE_SECONDS:
+        chunk = chunk[:chunk.rfind(b"\n") + 1]
+    state.update(window=(window + chunk)[-CHECK_BYTES:], offset=state["offset"] + len(chunk))
+    if chunk:
+        state["open_line"] = not chunk.endswith(b"\n")
+    if not chunk.strip():
+        return pd.DataFrame(columns=state["columns"])
+    return pd.read_csv(io.BytesIO(chunk), header=None, names=state["columns"], skip_blank_lines=True)
+
+
+def poll(path):
+    """Bring the live state for path up to date with the file and return it.
+
+    Appended rows are read from the previous end of the file and parsed on
+    their own, then added to the sessions, scores, rolling state and rollup
+    cube. A file that shrank, was replaced or had earlier rows edited is
+    reloaded in full. state["version"] changes whenever the data does.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    with _lock:
+        state = _logs.get(path)
+        if state is None:
+            state = _logs[path] = _load(path, stat)
+            return state
+        if stat.st_size == state["offset"] and stat.st_mtime == state["mtime"]:
+            return state
+
+        appended = stat.st_ino == state["inode"] and stat.st_size >= state["offset"]
+        rows = _read_tail(state, stat) if appended else None
+        if rows is None:
+            previous = state
+            state = _logs[path] = _load(path, stat)
+            state["reloads"] = previous["reloads"] + 1
+            state["version"] = previous["version"] + 1
+            return state
+
+        state["mtime"] = stat.st_mtime
+        if len(rows):
+            _derive(state, rows)
+            state["version"] += 1
+            state["appended"] += len(rows)
+        return state
+
+
+def forget(path):
+    """Drop the live state for a path"""
+    with _lock:
+        _logs.pop(os.path.abspath(path), None)
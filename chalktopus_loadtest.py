@@ -0,0 +1,124 @@
+"""Requests per second and latency of the chalktopus JSON API.
+
+    python chalktopus_loadtest.py --threads 8 --seconds 5
+    python chalktopus_loadtest.py --url http://127.0.0.1:8765 --threads 32
+
+Without --url an API server is started in this process, so client and server
+share one interpreter and the numbers are a lower bound. Each client thread
+keeps one connection open and cycles through the endpoints, first fetching
+full bodies and then revalidating them with If-None-Match like a poller.
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+import chalktopus_datasets as datasets
+from chalktopus_api import serve
+
+# Requests each client cycles through
+PATHS = [
+    "/scores",
+    "/scores?start=2024-01-01&end=2024-06-30",
+    "/scores?location=" + quote("CENTRAL ROCK"),
+    "/weekly",
+    "/weekly?location=" + quote("CENTRAL ROCK"),
+    "/monthly-visits",
+    "/monthly-visits?location=" + quote("CENTRAL ROCK"),
+    "/visits",
+    "/visits?location=" + quote("CENTRAL ROCK"),
+]
+
+
+def _client(host, port, paths, revalidate, deadline, latencies, errors):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(path)
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+        if response.status not in (200, 304):
+            errors.append(path)
+        elif response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    connection.close()
+
+
+def run_load(host, port, paths, threads, seconds, revalidate):
+    """Run client threads against the API and return throughput and latency percentiles"""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    workers = [
+        threading.Thread(target=_client, args=(host, port, paths, revalidate, deadline, latencies, errors))
+        for _ in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else None,
+        "p95_ms": float(np.percentile(ms, 95)) if len(ms) else None,
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the chalktopus JSON API")
+    parser.add_argument("--url", help="API to test (default: start one in this process)")
+    parser.add_argument("--dataset", default=datasets.DEFAULT_DATASET, help="dataset the in-process server serves")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--seconds", type=float, default=5, help="duration of each phase")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        server = serve(port=0, dataset=args.dataset)
+        host, port = server.server_address[:2]
+
+    # The first request for each path builds its response; time that on its own
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    for path in PATHS:
+        start = time.perf_counter()
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        print(f"cold {path:45s} {response.status} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    connection.close()
+
+    for label, revalidate in [("200 (cached body)", False), ("304 (If-None-Match)", True)]:
+        result = run_load(host, port, PATHS, args.threads, args.seconds, revalidate)
+        print(f"{label:22s} {result['rps']:8.0f} req/s  p50 {result['p50_ms']:.2f} ms  "
+              f"p95 {result['p95_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms  "
+              f"({result['requests']} requests, {result['errors']} errors, {args.threads} clients)")
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import difflib
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from chalktopus_core import LOCATION_ALIASES, clean_location
+from chalktopus_memo import LatestVersion
+from chalktopus_snapshot import SNAPSHOT_DIR
+
+# Gym details keyed by canonical location key
+LOCATIONS_PATH = os.environ.get("CHALKTOPUS_LOCATIONS", "locations.json")
+
+# Fuzzy matches already worked out, so each unknown spelling is only matched once
+MATCHES_PATH = os.path.join(SNAPSHOT_DIR, "location_matches.json")
+
+# Minimum similarity for a fuzzy match, and how far ahead of the next gym it must be
+FUZZY_CUTOFF = 0.8
+FUZZY_MARGIN = 0.05
+
+# Resolvers per locations path, rebuilt when locations.json's mtime changes
+_resolvers = LatestVersion()
+
+
+def _tokens(name):
+    return frozenset(name.replace(",", " ").split())
+
+
+def load_locations(path=LOCATIONS_PATH):
+    """Gym details from locations.json, or {} if it can't be read"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def locations_version(locations):
+    """Short hash of the gym registry, so edits to locations.json invalidate anything built from it"""
+    return hashlib.sha1(json.dumps(locations, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def build_resolver(locations, aliases=LOCATION_ALIASES):
+    """Compile the lookup tables used to resolve location spellings to gym keys.
+
+    Exact lookups cover the gym keys, the alias table and each gym's display
+    name; the same strings are the candidates for fuzzy matching.
+    """
+    exact = {clean_location(key): key for key in locations}
+    exact.update({clean_location(loc["name"]): key for key, loc in locations.items() if loc.get("name")})
+    exact.update({alias: key for alias, key in aliases.items()})
+    version = hashlib.sha1(json.dumps(sorted(exact.items())).encode("utf-8")).hexdigest()[:16]
+    return {
+        "exact": exact,
+        "candidates": [(text, _tokens(text), key) for text, key in exact.items()],
+        "version": version,
+    }
+
+
+def get_resolver(path=LOCATIONS_PATH):
+    """Resolver for a locations file, rebuilt only when the file changes"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    return _resolvers.get(path, mtime, lambda: build_resolver(load_locations(path)))
+
+
+def fuzzy_match(name, resolver):
+    """Best gym key for an unknown spelling, or None if no gym is a clear winner"""
+    # A known name spelled out in full ("CENTRAL ROCK GYM") wins if it points at one gym
+    tokens = _tokens(name)
+    contained = {key for _, candidate_tokens, key in resolver["candidates"] if candidate_tokens and candidate_tokens <= tokens}
+    if len(contained) == 1:
+        return contained.pop()
+
+    best = {}
+    for text, _, key in resolver["candidates"]:
+        ratio = difflib.SequenceMatcher(None, name, text).ratio()
+        best[key] = max(best.get(key, 0), ratio)
+    ranked = sorted(best.values(), reverse=True)
+    if not ranked or ranked[0] < FUZZY_CUTOFF:
+        return None
+    # "MOVEMENT" is as close to Movement VA as to Movement MD; leave it alone
+    if len(ranked) > 1 and ranked[0] - ranked[1] < FUZZY_MARGIN:
+        return None
+    return max(best, key=best.get)
+
+
+def _read_matches(path, version):
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Matches made against a different set of gyms may no longer be right
+    return saved.get("matches", {}) if saved.get("version") == version else {}
+
+
+def _write_matches(path, version, matches):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": version, "matches": matches}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def resolve_names(names, resolver=None, matches_path=None, save=True):
+    """Map cleaned location names to gym keys; names no gym matches are kept as they are.
+
+    With save=False new fuzzy matches are not added to the memo, for callers
+    resolving names they don't control (such as API query strings).
+    """
+    resolver = resolver or get_resolver()
+    matches_path = matches_path or MATCHES_PATH
+    resolved = {}
+    unknown = []
+    for name in names:
+        if name in resolver["exact"]:
+            resolved[name] = resolver["exact"][name]
+        else:
+            unknown.append(name)
+
+    if unknown:
+        matches = _read_matches(matches_path, resolver["version"])
+        new_names = [name for name in unknown if name not in matches]
+        for name in new_names:
+            matches[name] = fuzzy_match(name, resolver)
+        if new_names and save:
+            try:
+                _write_matches(matches_path, resolver["version"], matches)
+            except OSError:
+                # The memo only saves time; matching again next run is fine
+                pass
+        for name in unknown:
+            resolved[name] = matches[name] or name
+    return resolved
+
+
+def resolve_locations(values, resolver=None, matches_path=None):
+    """Resolve a column of location spellings to a categorical of gym keys.
+
+    Only the distinct spellings are cleaned and matched, so the cost grows with
+    the number of gym names rather than the number of sessions.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    cleaned = [clean_location(value) for value in uniques]
+    resolved = resolve_names(set(cleaned), resolver, matches_path)
+    categories = pd.Index(sorted(set(resolved.values())))
+    unique_codes = categories.get_indexer([resolved[name] for name in cleaned])
+    # Missing locations keep code -1, which the categorical reads as NaN
+    mapped = unique_codes[codes] if len(unique_codes) else codes
+    mapped[codes < 0] = -1
+    return pd.Series(pd.Categorical.from_codes(mapped, categories), index=values.index, name=values.name)
@@ -0,0 +1,114 @@
+import math
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import folium
+from folium.plugins import FastMarkerCluster
+
+from chalktopus_locations import locations_version
+from chalktopus_memo import LatestVersion
+
+# Past this many gyms, nearby markers are grouped into clusters and created in the browser
+CLUSTER_THRESHOLD = int(os.environ.get("CHALKTOPUS_MAP_CLUSTER_AT", 50))
+
+# Built maps (and their rendered HTML) kept in memory, one per (locations version, visit counts)
+MAX_CACHED_MAPS = 8
+
+# Marker emoji sizes in px for unvisited gyms and for the most visited gym
+MARKER_MIN_PX = 16
+MARKER_MAX_PX = 40
+
+_maps = OrderedDict()
+_indexes = LatestVersion()
+_lock = threading.Lock()
+
+
+def location_index(locations, version=None):
+    """Upper-cased display name (as shown in marker tooltips) -> location key, built once per registry version"""
+    version = version or locations_version(locations)
+    return _indexes.get(None, version, lambda: {loc["name"].upper(): key for key, loc in locations.items()})
+
+
+def marker_size(visits, max_visits):
+    """Emoji size in px, growing with the square root of visits so area tracks visit count"""
+    if not visits or not max_visits:
+        return MARKER_MIN_PX
+    return round(MARKER_MIN_PX + (MARKER_MAX_PX - MARKER_MIN_PX) * math.sqrt(visits / max_visits))
+
+
+# Builds each clustered marker from one row of [lat, lon, tooltip, popup, icon html], like folium.Marker would
+_CLUSTER_MARKER = """function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: L.divIcon({html: row[4], className: "empty"})});
+    marker.bindTooltip("<div>" + row[2] + "</div>", {sticky: true});
+    marker.bindPopup(row[3]);
+    return marker;
+}"""
+
+
+def _markers(locations, visit_counts):
+    """[lat, lon, tooltip, popup html, icon html] for each gym"""
+    max_visits = max(visit_counts.values(), default=0)
+    rows = []
+    for key, loc in locations.items():
+        visits = visit_counts.get(key, 0)
+        # Tooltips are the name in capitals, which location_index maps back to the key
+        name = loc['name'].upper()
+        popup_html = f"<b>{name}</b><br>{loc['address']}<br>Visits: {visits}<br><a href='{loc['website']}' target='_blank'>Website</a>"
+        # Unvisited gyms are dimmed so the ones climbed at stand out
+        style = f"font-size: {marker_size(visits, max_visits)}px;" + ("" if visits else " opacity: 0.5;")
+        rows.append([loc['latitude'], loc['longitude'], name, popup_html, f"<div style='{style}'>🧗‍♂️</div>"])
+    return rows
+
+
+def build_map(locations, visit_counts):
+    """Folium map with one marker per gym, sized by visits.
+
+    Large registries go into one clustered layer whose markers are created in
+    the browser from a data array, so rendering the map (which st_folium does
+    on every rerun) costs about the same for 50 gyms as for thousands.
+    Clicking a marker reports its tooltip either way.
+    """
+    m = folium.Map(location=[20, 0], zoom_start=2)
+    rows = _markers(locations, visit_counts)
+    if len(rows) > CLUSTER_THRESHOLD:
+        FastMarkerCluster(rows, callback=_CLUSTER_MARKER).add_to(m)
+        return m
+    for lat, lon, name, popup_html, icon_html in rows:
+        folium.Marker(location=[lat, lon], popup=popup_html, tooltip=name, icon=folium.DivIcon(html=icon_html)).add_to(m)
+    return m
+
+
+def _cached_entry(locations, visit_counts, version):
+    key = (version or locations_version(locations), tuple(sorted(visit_counts.items())))
+    with _lock:
+        if key in _maps:
+            _maps.move_to_end(key)
+            return _maps[key]
+
+    # Kept pickled and unrendered: folium's render isn't idempotent, so each caller gets its own copy
+    entry = {"pickled": pickle.dumps(build_map(locations, visit_counts)), "html": None}
+
+    with _lock:
+        entry = _maps.setdefault(key, entry)
+        while len(_maps) > MAX_CACHED_MAPS:
+            _maps.popitem(last=False)
+    return entry
+
+
+def cached_map(locations, visit_counts, version=None):
+    """Unrendered copy of the map for this registry and these visits.
+
+    Copies share folium's element ids, so the generated script is identical on
+    every rerun and st_folium doesn't remount the component.
+    """
+    return pickle.loads(_cached_entry(locations, visit_counts, version)["pickled"])
+
+
+def map_html(locations, visit_counts, version=None):
+    """Standalone HTML page for the map, rendered once per registry version and visit counts"""
+    entry = _cached_entry(locations, visit_counts, version)
+    if entry["html"] is None:
+        entry["html"] = pickle.loads(entry["pickled"]).get_root().render()
+    return entry["html"]
@@ -0,0 +1,29 @@
+import threading
+
+
+class LatestVersion:
+    """Values kept for the latest version of each group only (e.g. one parsed frame per snapshot file).
+
+    Building a new version drops the old one for that group, so a file or
+    registry that keeps changing never holds more than one value in memory.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, group, version, build):
+        """Value for this group and version, calling build() if it isn't the one kept"""
+        with self._lock:
+            kept = self._values.get(group)
+            if kept is None or kept[0] != version:
+                kept = self._values[group] = (version, build())
+            return kept[1]
+
+    def put(self, group, version, value):
+        with self._lock:
+            self._values[group] = (version, value)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
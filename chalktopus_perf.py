@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Set to a file path, or "-" for stderr, to write one JSON line per stage and per run
+PERF_LOG = os.environ.get("CHALKTOPUS_PERF_LOG")
+
+# Track memory high-water marks per stage; tracemalloc slows Python code down noticeably
+TRACK_MEMORY = os.environ.get("CHALKTOPUS_PERF_MEMORY", "").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("chalktopus.perf")
+if PERF_LOG and not logger.handlers:
+    handler = logging.StreamHandler() if PERF_LOG == "-" else logging.FileHandler(PERF_LOG)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# The run being recorded on this thread
+_local = threading.local()
+
+
+def _emit(record):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(dict(record, ts=round(time.time(), 3)), default=str))
+
+
+def start_run(name="rerun"):
+    """Begin collecting stage timings for one script run on this thread"""
+    if TRACK_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _local.run = {"name": name, "started": time.perf_counter(), "records": [], "peaks": []}
+
+
+def run_records():
+    """Stage records collected so far in this thread's run"""
+    run = getattr(_local, "run", None)
+    return list(run["records"]) if run else []
+
+
+@contextmanager
+def stage(name, rows=None, **fields):
+    """Time a block as one pipeline stage.
+
+    Yields a dict the block can fill in (e.g. rows, cached) before it ends.
+    Stages can nest; records keep the order the stages started in, with a
+    depth so the panel can indent them under their parent.
+    """
+    run = getattr(_local, "run", None)
+    record = {"stage": name, "rows": rows, **fields}
+    if run is None:
+        yield record
+        return
+
+    record["depth"] = len(run["peaks"])
+    run["records"].append(record)
+    if TRACK_MEMORY:
+        # Fold the parent's peak so far in before resetting it for this stage
+        if run["peaks"]:
+            run["peaks"][-1] = max(run["peaks"][-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    run["peaks"].append(0)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        peak = run["peaks"].pop()
+        if TRACK_MEMORY:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            record["peak_kb"] = round(peak / 1024, 1)
+            if run["peaks"]:
+                run["peaks"][-1] = max(run["peaks"][-1], peak)
+        _emit(dict(record, run=run["name"]))
+
+
+def record(name, ms, rows=None, **fields):
+    """Add a stage measured elsewhere, e.g. a chart rendered in another process, to this thread's run"""
+    run = getattr(_local, "run", None)
+    entry = {"stage": name, "rows": rows, **fields, "ms": round(ms, 2)}
+    if run is not None:
+        entry["depth"] = len(run["peaks"])
+        run["records"].append(entry)
+        _emit(dict(entry, run=run["name"]))
+    return entry
+
+
+def finish_run():
+    """Close this thread's run, log its total and return (total_ms, records)"""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return 0.0, []
+    _local.run = None
+    total_ms = round((time.perf_counter() - run["started"]) * 1000, 2)
+    _emit({"run": run["name"], "stage": "total", "ms": total_ms, "stages": len(run["records"])})
+    return total_ms, run["records"]
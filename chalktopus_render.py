@@ -0,0 +1,251 @@
+"""Chart drawing as pure functions, rendered in a pool of worker processes.
+
+Every draw_* function takes plain data (frames, series, lists, numbers) and
+returns a matplotlib figure, so it can be pickled to a worker by name and
+the worker sends back PNG bytes. The dashboard and the static export queue
+their charts with submit_cached and place each one as it finishes, so a
+rerun waits for the slowest chart rather than the sum of them.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from chalktopus_figcache import figure_bytes, figure_key, lookup, store
+
+# Worker processes for rendering; 1 renders on the calling thread instead
+RENDER_WORKERS = int(os.environ.get("CHALKTOPUS_RENDER_WORKERS", min(os.cpu_count() or 1, 8)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Charts
+
+def _pyplot():
+    """pyplot on the Agg backend, imported on first use so importing this module stays cheap"""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def draw_trend(points, column, title, ylabel):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(points["Dates"], points[column], marker="o", linestyle="-")
+    ax.set_xlabel("Date")
+    ax.set_ylabel(ylabel)
+    ax.set_title(title + " Over Time")
+    ax.grid(True)
+    plt.xticks(rotation=45)
+    return fig
+
+
+def draw_smoothed(series, title, ylabel):
+    """One line per window; series maps a window label to its (Dates, Value) points"""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for label, points in series.items():
+        ax.plot(points["Dates"], points["Value"], marker="o", markersize=3, linestyle="-", label=f"{label} window")
+    ax.set_xlabel("Date")
+    ax.set_ylabel(ylabel)
+    ax.set_title(title + " Over Time")
+    ax.grid(True)
+    if series:
+        ax.legend()
+    plt.xticks(rotation=45)
+    return fig
+
+
+def draw_load(acute, chronic, ratio, ylabel):
+    """Acute and chronic load above their ratio; each argument is a (Dates, Value) frame"""
+    plt = _pyplot()
+    fig, (ax, ratio_ax) = plt.subplots(2, 1, figsize=(12, 7), sharex=True, height_ratios=[2, 1])
+    for label, points in [("Acute", acute), ("Chronic", chronic)]:
+        ax.plot(points["Dates"], points["Value"], label=f"{label} load")
+    ax.set_ylabel(ylabel)
+    ax.set_title("Acute (7 day) vs Chronic (28 day) Load")
+    ax.grid(True)
+    ax.legend()
+    ratio_ax.plot(ratio["Dates"], ratio["Value"], color="gray")
+    ratio_ax.axhline(1, color="black", linewidth=0.8, linestyle="--")
+    ratio_ax.set_ylabel("Acute:Chronic")
+    ratio_ax.grid(True)
+    plt.xticks(rotation=45)
+    return fig
+
+
+def draw_bars(values, xlabel, ylabel, title):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(12, 6))
+    values.plot(kind="bar", ax=ax)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    return fig
+
+
+def draw_monthly_visits(points, weekly_average=False):
+    """Visits per month (or per week, averaged by month) from (Month, Visits) points"""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(points["Month"], points["Visits"], marker="o", linestyle="-", linewidth=2, markersize=6)
+    ax.set_xlabel("Month")
+    if weekly_average:
+        ax.set_ylabel("Average Number of Visits per Week")
+        ax.set_title("Average Number of Visits per Week by Month")
+    else:
+        ax.set_ylabel("Number of Visits")
+        ax.set_title("Number of Visits per Month")
+    ax.grid(True)
+    plt.xticks(rotation=45)
+
+    # One label per month with visits; callers pass downsampled points, which bounds how many are drawn
+    labelled = points[points["Visits"] > 0]
+    number_format = "{:.1f}" if weekly_average else "{:.0f}"
+    for date, visits in zip(labelled["Month"], labelled["Visits"]):
+        ax.annotate(number_format.format(visits), (date, visits), textcoords="offset points", xytext=(0, 10), ha="center")
+    return fig
+
+
+def draw_pie(labels, values):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 8))
+    ax.pie(values, labels=labels, autopct="%1.1f%%", startangle=90)
+    ax.set_title("Distribution of Visits by Location")
+    return fig
+
+
+def draw_difficulty(bins, grades, bin_label, bin_width, show_tried):
+    """Small multiples, one row per grade, with completed and tried side by side in each bin"""
+    plt = _pyplot()
+    fig, axes = plt.subplots(len(grades), 1, figsize=(10, 1.6 * len(grades) + 1), sharex=True, squeeze=False)
+    width = bin_width / 2 if show_tried else bin_width
+    offset = pd.Timedelta(days=width / 2) if show_tried else pd.Timedelta(0)
+    for ax, grade in zip(axes[:, 0], grades):
+        ax.bar(bins.index - offset, bins[f"{grade}_completed"], width=width, label="Completed")
+        if show_tried:
+            ax.bar(bins.index + offset, bins[f"{grade}_tried"], width=width, label="Tried", color="orange")
+        ax.set_ylabel(grade.upper())
+        ax.grid(True, axis="y", alpha=0.3)
+    axes[0, 0].legend(loc="upper left")
+    axes[-1, 0].set_xlabel("Date")
+    fig.suptitle(f"Climbs per {bin_label} for each grade")
+    fig.autofmt_xdate(rotation=45)
+    return fig
+
+
+def draw_sweep(sweep, family, method):
+    plt = _pyplot()
+    fig, axes = plt.subplots(3, 1, figsize=(10, 8), sharex=True)
+    axes[0].plot(sweep.index, sweep["relative_slope"])
+    axes[0].set_ylabel("Trend / Mean per Year")
+    axes[1].plot(sweep.index, sweep["cv"])
+    axes[1].set_ylabel("Coefficient of Variation")
+    axes[2].plot(sweep.index, sweep["rank_vs_reference"], label=f"vs {method}")
+    axes[2].plot(sweep.index, sweep["rank_vs_next"], label="vs next curve")
+    axes[2].set_ylabel("Rank Correlation")
+    axes[2].legend()
+    axes[2].set_xlabel(family)
+    for ax in axes:
+        ax.grid(True)
+    fig.suptitle(f"{family.title()} Curves")
+    return fig
+
+
+# Rendering
+
+def _init_worker():
+    # Fonts missing from the worker's system fall back quietly instead of warning per figure
+    logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+
+
+def render_chart(chart, args, fmt="png"):
+    """Draw chart(*args) and return the image bytes; this is what runs in a worker"""
+    _pyplot()
+    return figure_bytes(chart(*args), fmt)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked: the dashboard process runs threads that a fork would copy mid-flight
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+            )
+        return _pool
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _discard_if_broken(future):
+    # A worker killed mid-render breaks the whole pool; the next submit starts a new one
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _discard_pool()
+
+
+def _render_inline(chart, args, fmt):
+    future = Future()
+    try:
+        future.set_result(render_chart(chart, args, fmt))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def submit(chart, *args, fmt="png"):
+    """Future for the image bytes of chart(*args), rendered in the pool when there is one"""
+    if RENDER_WORKERS <= 1:
+        return _render_inline(chart, args, fmt)
+    try:
+        future = _get_pool().submit(render_chart, chart, args, fmt)
+    except (BrokenProcessPool, RuntimeError):
+        # A worker died (or the pool was shut down); start a fresh pool and render this one here
+        _discard_pool()
+        return _render_inline(chart, args, fmt)
+    future.add_done_callback(_discard_if_broken)
+    return future
+
+
+def submit_cached(name, inputs, options, chart, prepare):
+    """Like submit, but served from (and stored in) the figure cache under name, inputs and options.
+
+    prepare() returns chart's arguments; it is only called on a cache miss, so
+    downsampling and other preparation is skipped for charts already rendered.
+    """
+    key = figure_key(name, inputs, options)
+    payload = lookup(key)
+    if payload is not None:
+        future = Future()
+        future.set_result(payload)
+        return future
+
+    future = submit(chart, *prepare())
+
+    def remember(done):
+        if not done.cancelled() and done.exception() is None:
+            store(key, done.result())
+
+    future.add_done_callback(remember)
+    return future
+
+
+def shutdown():
+    """Stop the worker processes"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
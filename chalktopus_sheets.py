@@ -1,123 +1,133 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import calplot
 import streamlit as st
-from streamlit_folium import st_folium
-import folium
 import json
-import seaborn as sns
+import time
 import numpy as np
+from concurrent.futures import as_completed
+from datetime import datetime
+import chalktopus_core as core
+from chalktopus_figcache import cache_info
+import chalktopus_perf as perf
+from chalktopus_locations import LOCATIONS_PATH
+import chalktopus_live as live
+import chalktopus_datasets as datasets
+import chalktopus_render as render
 
 st.set_page_config('🧗‍♂️chalktopus🐙', initial_sidebar_state="collapsed")
 
+# Time each stage of this rerun for the Performance panel and the JSON perf log
+perf.start_run()
+
 
 @st.cache_data
 def load_locations():
     try:
-        with open('locations.json') as f:
+        with open(LOCATIONS_PATH) as f:
             return json.load(f)
     except Exception as e:
         st.error(f"Error loading locations.json: {e}")
         return {}
 
-# Define different scoring methods
-def get_scoring_methods():
-    """Return dictionary of different scoring methods for climbing grades"""
-    return {
-        "Original Exponential": {"vb": 0.5, "v0": 1, "v1": 2, "v2": 4, "v3": 8, "v4": 12},
-        "Extended Exponential": {"vb": 0.5, "v0": 1, "v1": 2, "v2": 4, "v3": 8, "v4": 12, "v5": 20, "v6": 32},
-        "Fibonacci Progression": {"vb": 1, "v0": 1, "v1": 2, "v2": 3, "v3": 5, "v4": 8, "v5": 13, "v6": 21},
-        "Power Scaling (x^1.5)": {
-            "vb": round(0.5 ** 1.5, 1), 
-            "v0": round(1 ** 1.5, 1), 
-            "v1": round(2 ** 1.5, 1), 
-            "v2": round(3 ** 1.5, 1), 
-            "v3": round(4 ** 1.5, 1), 
-            "v4": round(5 ** 1.5, 1),
-            "v5": round(6 ** 1.5, 1),
-            "v6": round(7 ** 1.5, 1)
-        },
-        "Climbing Difficulty Curve (1.5x)": {
-            "vb": 1,
-            "v0": 2,
-            "v1": 3,
-            "v2": 5,
-            "v3": 7,
-            "v4": 11,
-            "v5": 16,
-            "v6": 24
-        }
-    }
-
-# Function to load data from public Google Sheets
+# Load a climber's sheet through the cache shared by every browser session
 def load_data_from_public_sheets():
     st.sidebar.header("Google Sheets Connection")
-    
-    # Allow user to enter sheet URL or ID
-    sheet_url = "https://docs.google.com/spreadsheets/d/15r0qE2WNQYk2CLqxnI7b5r9_OWyaOMFAtb_4t8_ylnA/edit?usp=sharing"
 
-    # Extract sheet ID from URL if necessary
-    if "spreadsheets/d/" in sheet_url:
-        sheet_id = sheet_url.split("spreadsheets/d/")[1].split("/")[0]
-    else:
-        sheet_id = sheet_url
-    
-    # Construct the export URL (CSV format)
-    export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-    
+    dataset_specs = datasets.load_datasets()
+    dataset = st.sidebar.selectbox("Climber", list(dataset_specs)) if len(dataset_specs) > 1 else next(iter(dataset_specs))
+
+    # Force a revalidation of the snapshot instead of waiting out the TTL
+    refresh = st.sidebar.button("Refresh sheet now")
+
     try:
-        # Read the CSV directly from the URL
-        data = pd.read_csv(export_url)
-        st.sidebar.success("Connected to Google Sheets successfully!")
-        return data
+        # Unchanged sheets aren't re-downloaded, and are parsed once per process rather than per session
+        data, info = datasets.load_dataset(dataset, refresh=refresh, datasets=dataset_specs)
     except Exception as e:
-        st.sidebar.warning(f"Failed to connect to Google Sheets: {e}")
-        st.sidebar.info("Using local CSV data instead...")
-        # Fallback to local CSV file
+        st.sidebar.error(f"Failed to load data for {dataset}: {e}")
+        return None, None, None
+
+    fetched = datetime.fromtimestamp(info["fetched_at"]).strftime("%Y-%m-%d %H:%M")
+    if info["status"] == "stale":
+        st.sidebar.warning(f"Failed to connect to Google Sheets: {info['error']}")
+        st.sidebar.info(f"Using last good snapshot from {fetched}")
+    elif info["status"] == "fallback":
+        st.sidebar.warning(f"Failed to connect to Google Sheets: {info['error']}")
+        st.sidebar.info("No snapshot yet, using local CSV data instead...")
+        st.sidebar.success("Loaded local CSV data successfully!")
+    elif info["status"] == "file":
+        st.sidebar.success(f"Loaded {info['source']} successfully!")
+    else:
+        st.sidebar.success("Connected to Google Sheets successfully!")
+        st.sidebar.caption(f"Snapshot {info['status']} (last checked {fetched})")
+    return data, dataset, info
+
+# Live mode follows a local CSV as it is written to instead of the Google Sheet
+st.sidebar.header("Live Mode")
+live_mode = st.sidebar.toggle("Watch local CSV", value=False,
+                              help="Rows appended to the file are added to the dashboard without reloading it")
+live_state = None
+if live_mode:
+    live_path = st.sidebar.text_input("CSV path", value="20250212_rockclimbing.csv")
+    with perf.stage("live_poll") as timing:
         try:
-            data = pd.read_csv("20250212_rockclimbing.csv")
-            st.sidebar.success("Loaded local CSV data successfully!")
-            return data
-        except Exception as local_e:
-            st.sidebar.error(f"Failed to load local data: {local_e}")
-            return None
-    
+            live_state = live.poll(live_path)
+        except (OSError, ValueError, KeyError) as e:
+            st.sidebar.error(f"Can't watch {live_path}: {e}")
+        else:
+            timing["rows"] = len(live_state["sessions"])
+
+    if live_state is not None:
+        st.session_state["live_version"] = live_state["version"]
+
+        @st.fragment(run_every=live.POLL_SECONDS)
+        def watch_live_file():
+            # Only this fragment reruns on the timer; the whole app reruns once the file has changed
+            try:
+                version = live.poll(live_path)["version"]
+            except (OSError, ValueError, KeyError):
+                return
+            if version != st.session_state.get("live_version"):
+                st.rerun()
+            st.caption(f"Watching {live_path}: {live_state['appended']} rows appended, {live_state['reloads']} full loads")
+
+        with st.sidebar:
+            watch_live_file()
+
 # Load the data
-data = load_data_from_public_sheets()
+if live_state is not None:
+    data = live_state["sessions"]
+    source_sha256 = f"live:{live_state['path']}:{live_state['version']}"
+else:
+    # The session store is used when it was built from exactly this data,
+    # otherwise only new or edited rows are parsed and the store is rebuilt
+    with perf.stage("fetch") as timing:
+        data, dataset, dataset_info = load_data_from_public_sheets()
+        timing["rows"] = None if data is None else len(data)
+    if data is not None:
+        source_sha256 = dataset_info["version"]
+        ingest_stats = dataset_info["ingest_stats"]
 
 if data is not None:
-    # Clean up location names: normalize for consistency
-    def normalize_location(loc):
-        if pd.isna(loc):
-            return loc
-        # Uppercase and strip
-        loc = str(loc).upper().strip()
-        # Normalize whitespace: collapse multiple spaces, normalize around commas
-        loc = ' '.join(loc.split())            # collapse whitespace
-        loc = loc.replace(' ,', ',').replace(', ', ',')  # remove spaces around commas
-        # Re-add single space after comma for standard format
-        loc = loc.replace(',', ', ')
-        # Strip again in case of trailing spaces
-        loc = loc.strip()
-
-        # Map known variations to canonical location keys
-        location_aliases = {
-            'VERTICALVENTURES': 'VERTICAL VENTURES',
-            'VERTICAL VENTURES': 'VERTICAL VENTURES',
-            'CENTRAL ROCK': 'CENTRAL ROCK',
-            'MOVEMENT, VA': 'MOVEMENT, VA',
-            'MOVEMENT, MD': 'MOVEMENT, MD',
-            'UPLIFT, WA': 'UPLIFT',
-            'UPLIFT': 'UPLIFT',
-            'EDINBURGH INTERNATIONAL CLIMBING ARENA': 'EDINBURGH INTERNATIONAL CLIMBING ARENA',
-        }
-        return location_aliases.get(loc, loc)
-
-    data["Location"] = data["Location"].apply(normalize_location)
+    if live_state is not None:
+        st.sidebar.caption(f"{len(data)} sessions from {live_state['path']} (version {live_state['version']})")
+    elif dataset_info["shared"]:
+        st.sidebar.caption(f"{len(data)} sessions from the shared cache")
+    elif ingest_stats is None:
+        st.sidebar.caption(f"Loaded {len(data)} sessions from the session store")
+    else:
+        st.sidebar.caption(f"Parsed {ingest_stats['processed']} new or edited rows, reused {ingest_stats['reused']}")
+        if "store_error" in ingest_stats:
+            st.sidebar.warning(f"Could not write session store: {ingest_stats['store_error']}")
+
+    # Rows without a usable date drop out of every chart, so say which ones they are
+    unparsed_dates = data["Dates"].isna()
+    if unparsed_dates.any():
+        st.sidebar.warning(f"{int(unparsed_dates.sum())} rows have a date that couldn't be parsed")
+        with st.sidebar.expander("Rows with unparsed dates"):
+            st.dataframe(data.loc[unparsed_dates, ["Location"] + [col for col in ["Comments"] if col in data.columns]])
 
     # Scoring method selection in sidebar
     st.sidebar.header("Scoring Options")
-    scoring_methods = get_scoring_methods()
+    scoring_methods = core.get_scoring_methods()
     selected_method = st.sidebar.selectbox(
         "Choose Scoring Method:",
         options=list(scoring_methods.keys()),
@@ -134,75 +144,16 @@ if data is not None:
         st.sidebar.write(f"{grade.upper()}: {weight}")
     
     # Display scoring method descriptions
-    scoring_descriptions = {
-        "Original Exponential": "Classic exponential doubling pattern (1, 2, 4, 8, 12)",
-        "Extended Exponential": "Continues exponential pattern to higher grades",
-        "Fibonacci Progression": "Natural growth following Fibonacci sequence",
-        "Power Scaling (x^1.5)": "Mathematical power scaling based on grade^1.5",
-        "Climbing Difficulty Curve (1.5x)": "Reflects real climbing difficulty progression (~1.5x multiplier)"
-    }
-    
-    st.sidebar.info(scoring_descriptions[selected_method])
-    
-    # Helper function to parse a value
-    def parse_value(value):
-        if pd.isna(value):
-            return 0, 0
-
-        # If it's a string, check for the format pattern
-        if isinstance(value, str):
-            parts = value.split()
-
-            # Format: "1 tried 3 other" or similar variations
-            if len(parts) >= 3 and "tried" in parts:
-                # Find position of "tried" in the parts
-                tried_index = parts.index("tried")
-
-                # Get completed count (number before "tried")
-                completed = int(parts[tried_index-1]) if tried_index > 0 and parts[tried_index-1].isdigit() else 0
-
-                # Get tried count (number after "tried")
-                tried = int(parts[tried_index+1]) if tried_index+1 < len(parts) and parts[tried_index+1].isdigit() else 0
-
-                return completed, tried
-
-            # Just "tried X" format
-            elif "tried" in parts:
-                # Find all numbers in the string
-                numbers = [int(s) for s in parts if s.isdigit()]
-                if numbers:
-                    return 0, numbers[0]
-
-            # Try to parse as a plain number if it contains only digits
-            elif value.isdigit():
-                return int(value), 0
-
-            return 0, 0
-
-        # If it's a number
-        try:
-            return int(value), 0
-        except (ValueError, TypeError):
-            return 0, 0
-
-    # Add new columns for completed and tried counts
-    for col in ["vb", "v0", "v1", "v2", "v3", "v4", "v5", "v6"]:
-        if col in data.columns:
-            data[f"{col}_completed"] = None
-            data[f"{col}_tried"] = None
-
-    # Process each row and column
-    for index, row in data.iterrows():
-        for col in ["vb", "v0", "v1", "v2", "v3", "v4", "v5", "v6"]:
-            if col in data.columns:
-                value = row[col]
-                completed, tried = parse_value(value)
-                if completed is not None:
-                    data.loc[index, f"{col}_completed"] = completed
-                if tried is not None:
-                    data.loc[index, f"{col}_tried"] = tried
-
-    
+    st.sidebar.info(core.SCORING_DESCRIPTIONS[selected_method])
+
+    # Score every method up front; switching methods is then a column lookup
+    with perf.stage("scoring", rows=len(data)) as timing:
+        if live_state is not None:
+            # Live mode scores each appended row as it arrives
+            method_scores = live_state["scores"]
+            timing["cached"] = True
+        else:
+            method_scores = datasets.cached(dataset, "scores", source_sha256, lambda: core.score_methods(data, scoring_methods))
 
     # Display the title
     st.title("🧗‍♂️chalktopus🐙")
@@ -217,21 +168,98 @@ if data is not None:
     # Grade selector (only show when in completed count mode)
     selected_grade = None
     if show_completed_counts:
-        grade_options = ["vb", "v0", "v1", "v2", "v3", "v4", "v5", "v6"]
-        # Filter to only show grades that are in the current data columns
-        available_grades = [grade for grade in grade_options if grade in data.columns]
+        # Only show grades that are in the current data columns
+        available_grades = core.available_grades(data)
         selected_grade = st.sidebar.selectbox("Select Grade to Display", available_grades, index=1 if len(available_grades) > 1 else 0)
 
+    # Long histories are downsampled before plotting; peaks and personal bests are always kept
+    max_plot_points = int(st.sidebar.number_input(
+        "Max Points per Time-Series Chart", min_value=50, max_value=20000, value=1000, step=50,
+        help="Longer series are reduced to about this many points with min/max bucketing"
+    ))
+
 
     # Separate completed and tried data into tables
-    completed_columns = [col for col in data.columns if "_completed" in col]
-    tried_columns = [col for col in data.columns if "_tried" in col]
+    completed_columns = core.completed_columns(data)
+    tried_columns = core.tried_columns(data)
 
     completed_table = data[["Location", "Dates"] + completed_columns]
     tried_table = data[["Location", "Dates"] + tried_columns]
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Graphs", "Data", "Smoothed Score Trend", "Macro Data", "Map", "Difficulty Graphs"])
-    
-    with tab2:
+
+    # The daily score is just the selected method's column; assign leaves the shared sessions frame untouched
+    data = data.assign(Daily_Score=method_scores[selected_method])
+
+    # Create display value based on toggle
+    if show_completed_counts and selected_grade:
+        # Use completed count for selected grade
+        grade_col = f"{selected_grade}_completed"
+        if grade_col in data.columns:
+            data["Display_Value"] = data[grade_col].fillna(0)
+            display_title = f"Daily {selected_grade.upper()} Completed"
+            display_ylabel = f"{selected_grade.upper()} Completed"
+        else:
+            data["Display_Value"] = data["Daily_Score"]
+            display_title = "Daily Climbing Scores"
+            display_ylabel = "Daily Score"
+    else:
+        # Use daily score
+        data["Display_Value"] = data["Daily_Score"]
+        display_title = "Daily Climbing Scores"
+        display_ylabel = "Daily Score"
+
+    # Sort by date
+    data = data.sort_values("Dates")
+
+    # Options that change how the score-based charts look
+    chart_options = {
+        "method": selected_method,
+        "show_completed_counts": show_completed_counts,
+        "selected_grade": selected_grade,
+        "max_points": max_plot_points,
+    }
+
+    # Charts queued by the view, placed by place_charts as their renders finish
+    pending_charts = []
+
+    def show_figure(name, inputs, options, chart, prepare):
+        """Reserve a spot for a chart and queue chart(*prepare()) unless the figure cache has it"""
+        slot = st.empty()
+        started = time.perf_counter()
+        missed = []
+
+        def timed_prepare():
+            missed.append(True)
+            return prepare()
+
+        future = render.submit_cached(name, inputs, options, chart, timed_prepare)
+        # Preparing the inputs, plus the render itself when there is no pool
+        submit_ms = (time.perf_counter() - started) * 1000
+        pending_charts.append((future, name, slot, submit_ms, not missed))
+
+    def place_charts():
+        """Fill each queued chart's spot in the order the renders complete"""
+        charts = {future: details for future, *details in pending_charts}
+        pending_charts.clear()
+        started = time.perf_counter()
+        for future in as_completed(charts):
+            name, slot, submit_ms, cached = charts[future]
+            try:
+                slot.image(future.result())
+            except Exception as e:
+                slot.error(f"Error rendering {name}: {e}")
+            # waited_ms is how long the placing loop was held up by this chart's render
+            perf.record(f"chart:{name}", submit_ms, cached=cached, waited_ms=round((time.perf_counter() - started) * 1000, 2))
+
+    def downsampled(frame, column):
+        """Rows of frame to plot for column: its overall shape, peaks and personal-best days"""
+        values = frame[column].to_numpy(dtype=float)
+        return frame.iloc[core.downsample_indices(values, max_plot_points, keep=core.record_indices(values))]
+
+    # Each view renders in its own function, so a rerun only pays for the view on screen.
+    # Views queue their charts with show_figure; the renders run in worker processes
+    # and place_charts fills them in as they finish
+
+    def render_data():
         # Show tables in Streamlit
         st.subheader("Completed Climbs")
         st.dataframe(completed_table)
@@ -239,98 +267,48 @@ if data is not None:
         st.subheader("Tried Climbs")
         st.dataframe(tried_table)
 
-        # Calculate the daily score
-        def calculate_score(row):
-            score = 0
-            for col in weightings.keys():
-                if f"{col}_completed" in row:
-                    if pd.notna(row[f"{col}_completed"]):
-                        score += row[f"{col}_completed"] * weightings[col]
-            return score
-
-        data["Daily_Score"] = data.apply(calculate_score, axis=1)
-
-        # Create display value based on toggle
-        if show_completed_counts and selected_grade:
-            # Use completed count for selected grade
-            grade_col = f"{selected_grade}_completed"
-            if grade_col in data.columns:
-                data["Display_Value"] = data[grade_col].fillna(0)
-                display_title = f"Daily {selected_grade.upper()} Completed"
-                display_ylabel = f"{selected_grade.upper()} Completed"
-            else:
-                data["Display_Value"] = data["Daily_Score"]
-                display_title = "Daily Climbing Scores"
-                display_ylabel = "Daily Score"
-        else:
-            # Use daily score
-            data["Display_Value"] = data["Daily_Score"]
-            display_title = "Daily Climbing Scores"
-            display_ylabel = "Daily Score"
+        # Side-by-side daily scores for every scoring method
+        st.subheader("Compare Scoring Methods")
+        st.dataframe(pd.concat([data[["Location", "Dates"]], method_scores], axis=1))
+        st.dataframe(method_scores.agg(["sum", "mean", "max"]).T)
 
-    # Convert 'Dates' to datetime format
-    data["Dates"] = pd.to_datetime(data["Dates"], errors="coerce")
+    def render_graphs():
+        from chalktopus_calendar import calendar_grid, color_limits, draw_year
 
-    # Sort by date
-    data = data.sort_values("Dates")
-    
-    with tab1: 
-        # Plot calendar heatmap using calplot with improved error handling
+        # Calendar heatmap, one panel per year so a new session only redraws its own year
         try:
             st.subheader("Calendar Heatmap")
-            
-            # Prepare data for calendar plot with proper validation
-            calendar_data = data.set_index("Dates")["Display_Value"]
-            
-            # Remove any NaN or infinite values that might cause issues
-            calendar_data = calendar_data.dropna()
-            calendar_data = calendar_data[np.isfinite(calendar_data)]
-            
-            if len(calendar_data) == 0:
+            with perf.stage("calendar_grid", rows=len(data)):
+                years, grid, in_year = calendar_grid(data["Dates"], data["Display_Value"])
+
+            if len(years) == 0:
                 st.warning("No valid data available for calendar heatmap.")
             else:
-                # Create calendar heatmap with error handling for pandas compatibility
-                fig, ax = calplot.calplot(calendar_data, cmap="coolwarm", colorbar=True)
-                st.pyplot(fig)
-                
-        except AttributeError as e:
-            if "pivot" in str(e).lower():
-                st.error("Calendar heatmap error: Pandas compatibility issue detected.")
-                st.info("This error may be due to incompatible versions of pandas and calplot. The pivot() method signature has changed in newer pandas versions.")
-                st.info("**Solution:** Try upgrading calplot to version >= 0.1.7.5 or downgrading pandas to < 2.0 if needed.")
-            else:
-                st.error(f"Calendar heatmap error: {e}")
-                
-        except ValueError as e:
-            st.error(f"Calendar heatmap data error: {e}")
-            st.info("This may be due to invalid date ranges or data values. Please check your data format.")
-            
+                # Every panel shares one color scale, so a new all-time high redraws them all
+                vmin, vmax = color_limits(grid)
+                for i, year in enumerate(years):
+                    show_figure(
+                        f"calendar_heatmap_{year}",
+                        [grid[i].tobytes(), in_year[i].tobytes()],
+                        {"vmin": vmin, "vmax": vmax},
+                        draw_year,
+                        lambda i=i, year=year: (grid[i], in_year[i], year, vmin, vmax),
+                    )
         except Exception as e:
             st.error(f"Error creating calendar heatmap: {e}")
-            st.info("The calendar heatmap could not be generated. This may be due to a version compatibility issue between pandas and calplot.")
-            st.info("**Troubleshooting:**")
-            st.info("1. Ensure you have calplot >= 0.1.7.5 installed")
-            st.info("2. Check pandas version compatibility")
-            st.info("3. Verify your data contains valid dates and numeric values")
 
         # Plot line graph of daily scores
         try:
             st.subheader(display_title + " Trend")
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.plot(data["Dates"], data["Display_Value"], marker="o", linestyle="-")
-            ax.set_xlabel("Date")
-            ax.set_ylabel(display_ylabel)
-            ax.set_title(display_title + " Over Time")
-            ax.grid(True)
-            plt.xticks(rotation=45)
-            st.pyplot(fig)
+            show_figure("trend", [data[["Dates", "Display_Value"]]], chart_options, render.draw_trend,
+                        lambda: (downsampled(data, "Display_Value"), "Display_Value", display_title, display_ylabel))
         except Exception as e:
             st.error(f"Error creating line plot: {e}")
         
 
     
-    with tab3:
-        # Implement a smoothing function using a rolling average
+    def render_smoothed_trend():
+        # Smooth over calendar windows rather than a fixed number of sessions
         try:
             if show_completed_counts and selected_grade:
                 smoothed_title = f"Smoothed {selected_grade.upper()} Completed Trend"
@@ -340,64 +318,109 @@ if data is not None:
                 smoothed_ylabel = "Smoothed Score"
                 
             st.subheader(smoothed_title)
-            data["Smoothed_Value"] = data["Display_Value"].rolling(window=7, min_periods=1).mean()
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.plot(data["Dates"], data["Smoothed_Value"], marker="o", linestyle="-")
-            ax.set_xlabel("Date")
-            ax.set_ylabel(smoothed_ylabel)
-            ax.set_title(smoothed_title + " Over Time")
-            ax.grid(True)
-            plt.xticks(rotation=45)
-            st.pyplot(fig)
+            windows = st.multiselect("Rolling Windows", core.ROLLING_WINDOWS, default=["7D"])
+            per_session = st.checkbox("Average per Session Instead of per Day", value=False,
+                                      help="Per day divides each window's total by its length, so layoffs lower the trend")
+            stat = "session" if per_session else "daily"
+
+            # One prefix-sum pass covers every grade and scoring method column
+            display_column = f"{selected_grade}_completed" if show_completed_counts and selected_grade else selected_method
+            series_frame = pd.concat([data[["Dates"] + completed_columns], method_scores.loc[data.index]], axis=1)
+            if live_state is not None:
+                # Kept up to date by appending to the prefix sums as rows arrive
+                rolling_state = live_state["rolling"]
+            else:
+                # Depends only on the dataset version, so every session and rerun shares one build
+                rolling_state = datasets.cached(
+                    dataset, "rolling_state", source_sha256,
+                    lambda: core.build_rolling_state(series_frame, completed_columns + list(method_scores.columns)),
+                )
+            smoothed = pd.DataFrame({"Dates": data["Dates"]})
+            for window in windows:
+                smoothed[window] = core.rolling_window(rolling_state, window, stat)[display_column]
+
+            def series_points(frame, column):
+                points = downsampled(frame.dropna(subset=[column]), column)
+                return points[["Dates", column]].rename(columns={column: "Value"})
+
+            show_figure(
+                "smoothed_trend", [smoothed], dict(chart_options, stat=stat), render.draw_smoothed,
+                lambda: (
+                    {window: series_points(smoothed, window) for window in windows},
+                    smoothed_title,
+                    smoothed_ylabel + (" per Session" if per_session else " per Day"),
+                ),
+            )
+
+            # Acute (7 day) vs chronic (28 day) exponentially weighted load
+            if st.checkbox("Show Acute/Chronic Load (EWMA)", value=False):
+                load = core.ewm_load(series_frame, display_column)
+
+                load_points = load.rename_axis("Dates").reset_index()
+                show_figure(
+                    "acute_chronic_load", [load], chart_options, render.draw_load,
+                    lambda: (
+                        series_points(load_points, "Acute"),
+                        series_points(load_points, "Chronic"),
+                        series_points(load_points, "Ratio"),
+                        smoothed_ylabel + " per Day",
+                    ),
+                )
         except Exception as e:
             st.error(f"Error creating smoothed trend plot: {e}")
     
-    with tab4:
+    def render_macro_data():
         st.subheader("Macro Data")
-        
+
+        # Every table below is a slice of the pre-aggregated rollup cube
+        with perf.stage("rollup_cube", rows=len(data)):
+            if live_state is not None:
+                rollup_cube = live_state["cube"]
+            else:
+                rollup_cube = datasets.cached(dataset, "rollup_cube", source_sha256,
+                                              lambda: core.build_rollup_cube(data, method_scores))
+        location_names = sorted(rollup_cube["month"].index.get_level_values("Location").dropna().unique())
+        selected_location = st.selectbox("Location", ["All locations"] + location_names)
+        locations = None if selected_location == "All locations" else [selected_location]
+
         # Calculate total climbs for each grade
-        total_climbs = data[completed_columns].sum()
+        total_climbs = core.rollup_slice(rollup_cube, "week", locations)[completed_columns].sum()
         st.subheader("Total Climbs")
         st.dataframe(total_climbs)
         
         # Plot total climbs for each grade
         try:
             st.subheader("Total Climbs Graph")
-            fig, ax = plt.subplots(figsize=(12, 6))
-            total_climbs.plot(kind='bar', ax=ax)
-            ax.set_xlabel("Grade")
-            ax.set_ylabel("Total Climbs")
-            ax.set_title("Total Climbs for Each Grade")
-            st.pyplot(fig)
+            show_figure("total_climbs", [total_climbs], {"location": selected_location}, render.draw_bars,
+                        lambda: (total_climbs, "Grade", "Total Climbs", "Total Climbs for Each Grade"))
         except Exception as e:
             st.error(f"Error creating total climbs graph: {e}")
         
-        # Calculate average climbs per week for each grade
-        # Use pd.Grouper to properly group by week, accounting for different years
-        data_for_weekly_climbs = data.set_index('Dates')
-        weekly_climbs = data_for_weekly_climbs.groupby(pd.Grouper(freq='W'))[completed_columns].sum()
-        # Only include weeks with at least one climb
-        weekly_climbs = weekly_climbs[weekly_climbs.sum(axis=1) > 0]
-        average_climbs_per_week = weekly_climbs.mean()
+        # Calculate average climbs per week for each grade, over weeks with at least one climb
+        average_climbs_per_week = core.rollup_average_per_week(rollup_cube, completed_columns, locations)
         st.subheader("Average Climbs per Week")
         st.dataframe(average_climbs_per_week)
         
         # Plot average climbs per week for each grade
         try:
             st.subheader("Average Climbs per Week Graph")
-            fig, ax = plt.subplots(figsize=(12, 6))
-            average_climbs_per_week.plot(kind='bar', ax=ax)
-            ax.set_xlabel("Grade")
-            ax.set_ylabel("Average Climbs per Week")
-            ax.set_title("Average Climbs per Week for Each Grade")
-            st.pyplot(fig)
+            show_figure("average_climbs_per_week", [average_climbs_per_week], {"location": selected_location}, render.draw_bars,
+                        lambda: (average_climbs_per_week, "Grade", "Average Climbs per Week", "Average Climbs per Week for Each Grade"))
         except Exception as e:
             st.error(f"Error creating average climbs per week graph: {e}")
         
         # Calculate total climbing sessions
-        total_sessions = data['Dates'].nunique()
+        # Distinct days, so two gyms on one day still count as one session
+        total_sessions = core.total_sessions(data if locations is None else data[data["Location"].isin(locations)])
         st.subheader("Total Climbing Sessions")
         st.write(f"Total Climbing Sessions: {total_sessions}")
+
+        # Per-gym totals straight from the cube
+        st.subheader("Breakdown by Location")
+        location_breakdown = core.rollup_by_location(rollup_cube, ["Sessions"] + completed_columns + [selected_method])
+        if locations is not None:
+            location_breakdown = location_breakdown.loc[locations]
+        st.dataframe(location_breakdown)
         
         # Monthly visits with zero values shown
         st.subheader("Monthly Visits")
@@ -405,23 +428,10 @@ if data is not None:
         # Add checkbox to toggle between monthly totals and weekly averages
         show_weekly_average = st.checkbox("Show Average Times per Week (Divide by 4)")
         
-        # Calculate the number of times you went per month
-        # Use pd.Grouper to properly group by month, accounting for different years
-        data_for_monthly = data.set_index('Dates')
-        monthly_visits = data_for_monthly.groupby(pd.Grouper(freq='ME')).size()
+        # Calculate the number of times you went per month, including months with zero visits
+        monthly_visits = core.rollup_monthly_visits(rollup_cube, locations)
         
-        # Create a complete date range to show months with zero visits
         if not monthly_visits.empty:
-            # Get the date range from first visit to last visit
-            min_date = data['Dates'].min()
-            max_date = data['Dates'].max()
-            
-            # Create monthly date range
-            complete_months = pd.date_range(start=min_date, end=max_date, freq='ME')
-            
-            # Reindex to include all months, filling missing with 0
-            monthly_visits = monthly_visits.reindex(complete_months, fill_value=0)
-            
             # Apply weekly average calculation if checkbox is checked
             display_visits = monthly_visits.copy()
             if show_weekly_average:
@@ -444,101 +454,59 @@ if data is not None:
             
             # Plot line graph of monthly visits
             try:
-                fig, ax = plt.subplots(figsize=(12, 6))
-                ax.plot(monthly_visits.index, display_visits.values, marker="o", linestyle="-", linewidth=2, markersize=6)
-                ax.set_xlabel("Month")
-                if show_weekly_average:
-                    ax.set_ylabel("Average Number of Visits per Week")
-                    ax.set_title("Average Number of Visits per Week by Month")
-                else:
-                    ax.set_ylabel("Number of Visits")
-                    ax.set_title("Number of Visits per Month")
-                ax.grid(True)
-                plt.xticks(rotation=45)
-                
-                # Add text annotations for months with visits
-                for i, (date, visits) in enumerate(zip(monthly_visits.index, display_visits.values)):
-                    if visits > 0:
-                        # Format the annotation value
-                        if show_weekly_average:
-                            annotation_text = f'{visits:.1f}'
-                        else:
-                            annotation_text = f'{int(visits)}'
-                        ax.annotate(annotation_text, (date, visits), textcoords="offset points", xytext=(0,10), ha='center')
-                
-                st.pyplot(fig)
+                show_figure(
+                    "monthly_visits", [monthly_visits],
+                    {"show_weekly_average": show_weekly_average, "max_points": max_plot_points, "location": selected_location},
+                    render.draw_monthly_visits,
+                    lambda: (downsampled(display_visits.rename("Visits").rename_axis("Month").reset_index(), "Visits"), show_weekly_average),
+                )
             except Exception as e:
                 st.error(f"Error creating monthly visits plot: {e}")
         else:
             st.info("No data available for monthly visits.")
 
-    with tab5:
-        st.subheader("Map")
-
-        def calculate_location_visits():
-            """Calculate visit counts for each location from the data"""
-            visit_counts = {}
-
-            # Count visits per location (already normalized upstream)
-            location_visits = data['Location'].value_counts()
+    def render_map():
+        from streamlit_folium import st_folium
+        from chalktopus_map import cached_map, location_index, locations_version
+        from chalktopus_geo import get_gym_index, region_rollup, sessions_within
 
-            for location, count in location_visits.items():
-                # Accumulate in case multiple raw names map to same key
-                if location in visit_counts:
-                    visit_counts[location] += int(count)
-                else:
-                    visit_counts[location] = int(count)
+        st.subheader("Map")
 
-            return visit_counts
-        
-        def create_map(locations, visit_counts):
-            m = folium.Map(location=[20,0], zoom_start=2)
-            for key, loc in locations.items():
-                # Get visit count for this location
-                visits = visit_counts.get(key, 0)
-                
-                # Make location name ALL CAPS
-                location_name_caps = loc['name'].upper()
-                
-                # Create popup with visit count
-                popup_html = f"<b>{location_name_caps}</b><br>{loc['address']}<br>Visits: {visits}<br><a href='{loc['website']}' target='_blank'>Website</a>"
-                
-                folium.Marker(
-                    location=[loc['latitude'], loc['longitude']],
-                    popup=popup_html,
-                    tooltip=location_name_caps,
-                    icon=folium.DivIcon(html=f"<div style='font-size: 24px;'>🧗‍♂️</div>")
-                ).add_to(m)
-            return m
-        
         # Load locations and calculate visits
         try:
             locations = load_locations()
-            visit_counts = calculate_location_visits()
+            visit_counts = core.location_visits(data)
             
             if locations:
-                map_ = create_map(locations, visit_counts)
-                map_data = st_folium(
-                    map_,
-                    width=700,
-                    height=500,
-                    key="climbing_map",
-                    returned_objects=["last_object_clicked"]
-                )
+                version = locations_version(locations)
+                with perf.stage("chart:folium_map", rows=len(locations)):
+                    # Built once per registry version and visit counts, with stable element ids;
+                    # large registries come back as one clustered layer that still reports clicks
+                    map_data = st_folium(
+                        cached_map(locations, visit_counts, version),
+                        width=700,
+                        height=500,
+                        key="climbing_map",
+                        returned_objects=["last_object_clicked_tooltip"],
+                    )
                 
                 # Display clicked location info with visit count
-                if map_data['last_object_clicked'] is not None:
-                    clicked_data = map_data['last_object_clicked']
-                    if clicked_data and 'tooltip' in clicked_data:
-                        clicked_location = clicked_data['tooltip']
-                        # Find the visit count for this location
-                        visits = 0
-                        for key, loc in locations.items():
-                            if loc['name'].upper() == clicked_location:
-                                visits = visit_counts.get(key, 0)
-                                break
-                        st.success(f"Selected location: {clicked_location} (Visits: {visits})")
+                clicked_location = map_data.get("last_object_clicked_tooltip")
+                if clicked_location:
+                    key = location_index(locations, version).get(clicked_location)
+                    visits = visit_counts.get(key, 0)
+                    st.success(f"Selected location: {clicked_location} (Visits: {visits})")
                 
+                # Per-region totals and radius queries come from the gym index, built once per registry version
+                gym_index = get_gym_index(locations)
+                st.subheader("Regions")
+                st.dataframe(region_rollup(data, gym_index, completed_columns))
+
+                center_key = st.selectbox("Sessions near", list(locations), format_func=lambda key: locations[key]["name"])
+                radius_km = st.slider("Radius (km)", min_value=1, max_value=500, value=50)
+                nearby = sessions_within(data, gym_index, locations[center_key]["latitude"], locations[center_key]["longitude"], radius_km)
+                st.write(f"{int(nearby.sum())} sessions within {radius_km} km of {locations[center_key]['name']}")
+
                 # Add pie chart showing visit distribution
                 st.subheader("Visit Distribution")
                 if visit_counts:
@@ -556,10 +524,8 @@ if data is not None:
                     
                     if chart_data:
                         # Create pie chart
-                        fig, ax = plt.subplots(figsize=(8, 8))
-                        ax.pie(chart_data, labels=chart_labels, autopct='%1.1f%%', startangle=90)
-                        ax.set_title("Distribution of Visits by Location")
-                        st.pyplot(fig)
+                        show_figure("visit_distribution", [chart_labels, chart_data], {}, render.draw_pie,
+                                    lambda: (chart_labels, chart_data))
                     else:
                         st.info("No visit data available for pie chart.")
                 else:
@@ -570,25 +536,22 @@ if data is not None:
             st.error(f"Error creating map: {e}")
             st.info("Please check that all required packages are installed: folium, streamlit-folium")
 
-    with tab6:
+    def render_difficulty_graphs():
         st.subheader("Difficulty Graphs")
         
-        # Function to plot bar graphs for each difficulty level
+        # One shared-axis small-multiples figure, one row per grade. Counts are summed
+        # into day/week/month bins picked from the span of the data, so the number of
+        # bars (and the render time) stays roughly constant as history grows
         def plot_difficulty_graphs(data, show_tried):
-            difficulties = ["vb", "v0", "v1", "v2", "v3", "v4", "v5", "v6"]
-            # Filter to only show grades that are in the current data columns
-            available_difficulties = [diff for diff in difficulties if diff in data.columns]
-            for difficulty in available_difficulties:
-                fig, ax = plt.subplots(figsize=(10, 5))
-                sns.barplot(x=data["Dates"], y=data[f"{difficulty}_completed"], ax=ax, label="Completed")
-                if show_tried:
-                    sns.barplot(x=data["Dates"], y=data[f"{difficulty}_tried"], ax=ax, label="Tried", color="orange")
-                ax.set_title(f"Climbs for {difficulty.upper()}")
-                ax.set_xlabel("Date")
-                ax.set_ylabel("Count")
-                ax.legend()
-                plt.xticks(rotation=45)
-                st.pyplot(fig)
+            freq, bin_label, bin_width = core.choose_time_bin(data["Dates"])
+            bins = core.binned_grade_counts(data, freq)
+            available_difficulties = core.available_grades(data)
+            if bins.empty or not available_difficulties:
+                st.info("No data available for difficulty graphs.")
+                return
+
+            show_figure("difficulty_graphs", [bins], {"show_tried": show_tried}, render.draw_difficulty,
+                        lambda: (bins, available_difficulties, bin_label, bin_width, show_tried))
         
         # Checkbox to toggle the display of the "tried" line
         show_tried = st.checkbox("Show Tried Climbs")
@@ -596,5 +559,59 @@ if data is not None:
         # Plot the difficulty graphs
         plot_difficulty_graphs(data, show_tried)
 
+    def render_scoring_sweep():
+        st.subheader("Scoring Sweep")
+        st.caption(f"Each curve is compared with the selected method ({selected_method}) for rank agreement")
+
+        # A whole grid of parametric curves is scored in one pass; compare them instead of one method per rerun
+        family = st.selectbox("Curve Family", list(core.SWEEP_FAMILIES),
+                              format_func={"power": "Power (grade^p)", "geometric": "Geometric (ratio r)", "fibonacci": "Fibonacci (offset)"}.get)
+        low, high = core.SWEEP_DEFAULTS[family]
+        if family == "fibonacci":
+            low, high = st.slider("Offset Range", 0, 10, (low, high))
+            params = np.arange(low, high + 1)
+        else:
+            low, high = st.slider("Parameter Range", 0.1, 5.0, (float(low), float(high)), step=0.05)
+            steps = st.slider("Curves", 10, 500, 200)
+            params = np.linspace(low, high, steps)
+
+        with perf.stage("scoring_sweep", rows=len(data), curves=len(params)):
+            sweep = core.sweep_scoring(data, family, params, reference=weightings)
+        st.dataframe(sweep)
+
+        show_figure("scoring_sweep", [sweep], {"method": selected_method}, render.draw_sweep,
+                    lambda: (sweep, family, selected_method))
+
+    views = {
+        "Graphs": render_graphs,
+        "Data": render_data,
+        "Smoothed Score Trend": render_smoothed_trend,
+        "Macro Data": render_macro_data,
+        "Map": render_map,
+        "Difficulty Graphs": render_difficulty_graphs,
+        "Scoring Sweep": render_scoring_sweep,
+    }
+    # A view selector instead of st.tabs: Streamlit runs every tab body on each rerun
+    selected_view = st.radio("View", list(views), horizontal=True, label_visibility="collapsed")
+    with perf.stage(f"view:{selected_view}", rows=len(data)):
+        views[selected_view]()
+        with perf.stage("charts", charts=len(pending_charts)):
+            place_charts()
+
 else:
     st.error("No data available. Please provide a valid public Google Sheet URL.")
+
+# Where this rerun's time went, per stage and per chart
+total_ms, perf_records = perf.finish_run()
+with st.sidebar.expander("Performance"):
+    st.caption(f"Rerun took {total_ms:.0f} ms")
+    if perf_records:
+        perf_table = pd.DataFrame(perf_records)
+        # Indent nested stages under the stage that ran them
+        perf_table["stage"] = ["\u2003" * depth + name for depth, name in zip(perf_table.pop("depth"), perf_table["stage"])]
+        st.dataframe(perf_table, hide_index=True)
+    figure_stats = cache_info()
+    st.caption(f"Figure cache: {figure_stats['entries']} charts, {figure_stats['hits']} hits, {figure_stats['misses']} misses")
+    dataset_stats = datasets.cache_info()
+    st.caption(f"Shared data cache: {dataset_stats['bytes'] / 2**20:.1f} of {dataset_stats['max_bytes'] / 2**20:.0f} MiB "
+               f"across {len(dataset_stats['datasets'])} datasets, {dataset_stats['hits']} hits, {dataset_stats['misses']} misses")
@@ -0,0 +1,112 @@
+import hashlib
+import io
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+
+import pandas as pd
+
+from chalktopus_memo import LatestVersion
+
+# Where the last good copy of each sheet export is kept
+SNAPSHOT_DIR = os.environ.get("CHALKTOPUS_SNAPSHOT_DIR", ".chalktopus_cache")
+
+# Seconds a snapshot is trusted before the sheet is revalidated
+DEFAULT_TTL = float(os.environ.get("CHALKTOPUS_SNAPSHOT_TTL", 300))
+
+# Parsed frame per snapshot path and content hash, so an unchanged sheet is parsed once per process
+_parsed_frames = LatestVersion()
+
+
+def snapshot_paths(url, snapshot_dir=SNAPSHOT_DIR):
+    """Return the (csv, metadata) paths used to snapshot a URL"""
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(snapshot_dir, f"{key}.csv"), os.path.join(snapshot_dir, f"{key}.json")
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(meta_path, meta):
+    _write_atomic(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+
+
+def _parse_snapshot(csv_path, sha256):
+    return _parsed_frames.get(csv_path, sha256, lambda: pd.read_csv(csv_path)).copy()
+
+
+def fetch_csv_snapshot(url, snapshot_dir=SNAPSHOT_DIR, ttl=DEFAULT_TTL, timeout=10):
+    """Load a CSV export through an on-disk snapshot with conditional revalidation.
+
+    Returns (data, info) where info["status"] is one of:
+      "fresh"        snapshot younger than ttl, no request made
+      "not-modified" server answered 304 to If-None-Match / If-Modified-Since
+      "unchanged"    server sent the body again but its hash matches the snapshot
+      "updated"      new content was downloaded and snapshotted
+      "stale"        the request failed and the last good snapshot was used
+    Raises the fetch error if the request fails and there is no snapshot yet.
+    """
+    csv_path, meta_path = snapshot_paths(url, snapshot_dir)
+    meta = _read_meta(meta_path) if os.path.exists(csv_path) else None
+    now = time.time()
+
+    if meta and now - meta.get("fetched_at", 0) < ttl:
+        return _parse_snapshot(csv_path, meta["sha256"]), dict(meta, status="fresh")
+
+    request = urllib.request.Request(url)
+    if meta and meta.get("etag"):
+        request.add_header("If-None-Match", meta["etag"])
+    if meta and meta.get("last_modified"):
+        request.add_header("If-Modified-Since", meta["last_modified"])
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+            headers = response.headers
+        sha256 = hashlib.sha256(payload).hexdigest()
+        status = "unchanged" if meta and meta.get("sha256") == sha256 else "updated"
+        if status == "updated":
+            # Make sure the payload parses before it replaces the last good snapshot
+            data = pd.read_csv(io.BytesIO(payload))
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and meta:
+            meta["fetched_at"] = now
+            _write_meta(meta_path, meta)
+            return _parse_snapshot(csv_path, meta["sha256"]), dict(meta, status="not-modified")
+        if meta:
+            return _parse_snapshot(csv_path, meta["sha256"]), dict(meta, status="stale", error=str(e))
+        raise
+    except Exception as e:
+        if meta:
+            return _parse_snapshot(csv_path, meta["sha256"]), dict(meta, status="stale", error=str(e))
+        raise
+
+    if status == "updated":
+        os.makedirs(snapshot_dir, exist_ok=True)
+        _write_atomic(csv_path, payload)
+        _parsed_frames.put(csv_path, sha256, data)
+
+    meta = {
+        "url": url,
+        "sha256": sha256,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "fetched_at": now,
+        "changed_at": now if status == "updated" else meta.get("changed_at", now),
+    }
+    _write_meta(meta_path, meta)
+    return _parse_snapshot(csv_path, sha256), dict(meta, status=status)
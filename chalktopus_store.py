@@ -0,0 +1,169 @@
+import argparse
+import hashlib
+import io
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+from chalktopus_core import GRADES
+from chalktopus_dates import FIRST_YEAR
+from chalktopus_ingest import ingest_rows
+from chalktopus_snapshot import fetch_csv_snapshot, SNAPSHOT_DIR
+
+# Pre-built, typed copy of the cleaned sessions
+STORE_PATH = os.environ.get("CHALKTOPUS_STORE", os.path.join(SNAPSHOT_DIR, "sessions.feather"))
+
+# Bump when the stored columns or types change so old stores get rebuilt
+STORE_VERSION = "3"
+
+# Schema metadata keys
+_SOURCE_KEY = b"chalktopus.source_sha256"
+_VERSION_KEY = b"chalktopus.store_version"
+
+
+def to_typed_sessions(data):
+    """Reduce an ingested frame to cleaned sessions with compact column types"""
+    count_columns = [f"{grade}_{kind}" for grade in GRADES for kind in ("completed", "tried") if f"{grade}_{kind}" in data.columns]
+    sessions = pd.DataFrame({
+        "Location": data["Location"].astype("category"),
+        "Dates": pd.to_datetime(data["Dates"], errors="coerce"),
+    })
+    for col in count_columns:
+        # Counts are small non-negative integers, so uint8 almost always fits
+        sessions[col] = pd.to_numeric(data[col], downcast="unsigned")
+    if "Comments" in data.columns:
+        sessions["Comments"] = data["Comments"].astype("string")
+    return sessions.reset_index(drop=True)
+
+
+def write_store(sessions, source_sha256, path=STORE_PATH):
+    """Write typed sessions to an uncompressed Feather file tagged with its source hash"""
+    table = pa.Table.from_pandas(sessions, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SOURCE_KEY] = source_sha256.encode("utf-8")
+    metadata[_VERSION_KEY] = STORE_VERSION.encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    # Uncompressed: the store is small and read far more often than written, so skip decompressing on every load
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def load_store(path=STORE_PATH, source_sha256=None):
+    """Load typed sessions from the store, or None if it is missing, outdated or built from other data"""
+    if not os.path.exists(path):
+        return None
+    try:
+        # Only the footer is read for the schema, so a stale store is turned down without reading its columns
+        with ipc.open_file(path) as reader:
+            metadata = reader.schema.metadata or {}
+        if metadata.get(_VERSION_KEY) != STORE_VERSION.encode("utf-8"):
+            return None
+        if source_sha256 is not None and metadata.get(_SOURCE_KEY) != source_sha256.encode("utf-8"):
+            return None
+        return feather.read_table(path).to_pandas()
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def open_source(source):
+    """Version a raw log from a CSV path or a sheet export URL, returning (read, sha256, anchor).
+
+    read() parses the log; a CSV file is only hashed until then, so callers
+    that find a matching store never parse it. anchor is when the log was
+    last changed (the file's modification time, or when the sheet's current
+    content was first downloaded); year-less dates are dated back from it.
+    """
+    if source.startswith(("http://", "https://")):
+        data, snapshot = fetch_csv_snapshot(source, ttl=0)
+        return lambda: data, snapshot["sha256"], pd.Timestamp(snapshot.get("changed_at", snapshot["fetched_at"]), unit="s")
+    with open(source, "rb") as f:
+        payload = f.read()
+    # Parsed from the bytes that were hashed, so the data always matches its version
+    return lambda: pd.read_csv(io.BytesIO(payload)), hashlib.sha256(payload).hexdigest(), pd.Timestamp(os.path.getmtime(source), unit="s")
+
+
+def read_source(source):
+    """Read a raw log from a CSV path or a sheet export URL, returning (data, sha256, anchor); see open_source"""
+    read, sha256, anchor = open_source(source)
+    return read(), sha256, anchor
+
+
+def store_tag(source_sha256, first_year=None, anchor=None):
+    """What a store was built from: the raw data, plus whatever year-less dates were dated by"""
+    first_year = FIRST_YEAR if first_year is None else first_year
+    if first_year is not None:
+        return f"{source_sha256}:{first_year}"
+    if anchor is not None:
+        return f"{source_sha256}:{pd.Timestamp(anchor):%Y-%m-%d}"
+    return source_sha256
+
+
+def store_path_for(source):
+    """Store path for a given log, so batch runs over several logs don't overwrite each other"""
+    key = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SNAPSHOT_DIR, f"sessions-{key}.feather")
+
+
+def sessions_from_raw(raw, source_sha256, source="default", path=STORE_PATH, use_store=True, first_year=None, anchor=None):
+    """Return (sessions, ingest_stats) for a raw log, given as a frame or a function that reads it.
+
+    The store is used as-is when it was built from the same raw data and year
+    settings (first_year, anchor; see parse_dates), in which case ingest_stats is None. Otherwise the rows are ingested and the store is
+    rewritten; a failure to write it is reported in ingest_stats["store_error"].
+    """
+    tag = store_tag(source_sha256, first_year, anchor)
+    if use_store:
+        sessions = load_store(path, tag)
+        if sessions is not None:
+            return sessions, None
+
+    raw = raw() if callable(raw) else raw
+    data, ingest_stats = ingest_rows(raw, source=source, first_year=first_year, anchor=anchor)
+    sessions = to_typed_sessions(data)
+    if use_store:
+        try:
+            write_store(sessions, tag, path)
+        except OSError as e:
+            ingest_stats["store_error"] = str(e)
+    return sessions, ingest_stats
+
+
+def load_sessions(source, path=None, use_store=True, first_year=None):
+    """Load typed sessions for a CSV path or export URL through its own store"""
+    read, sha256, anchor = open_source(source)
+    sessions, _ = sessions_from_raw(read, sha256, source, path or store_path_for(source), use_store, first_year, anchor)
+    return sessions
+
+
+def build_store(source, path=STORE_PATH, first_year=None):
+    """Rebuild the store from a raw log and return the typed sessions"""
+    raw, sha256, anchor = read_source(source)
+    data, _ = ingest_rows(raw, source=source, first_year=first_year, anchor=anchor)
+    sessions = to_typed_sessions(data)
+    write_store(sessions, store_tag(sha256, first_year, anchor), path)
+    return sessions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the typed chalktopus session store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="rebuild the store from a CSV file or sheet export URL")
+    build.add_argument("source", nargs="?", default="20250212_rockclimbing.csv", help="CSV path or export URL")
+    build.add_argument("-o", "--output", default=STORE_PATH, help=f"store path (default: {STORE_PATH})")
+    build.add_argument("--first-year", type=int, help="year of the first row of a year-less log")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        sessions = build_store(args.source, args.output, args.first_year)
+        size_kb = os.path.getsize(args.output) / 1024
+        print(f"Wrote {len(sessions)} sessions to {args.output} ({size_kb:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
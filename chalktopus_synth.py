@@ -0,0 +1,93 @@
+"""Synthetic climbing logs in the same layout as 20250212_rockclimbing.csv.
+
+    python chalktopus_synth.py --sessions 50000 --years 10 -o synthetic.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from chalktopus_core import GRADES
+
+# How the same gyms get typed into the sheet, most common spelling first
+GYM_SPELLINGS = {
+    "CENTRAL ROCK": ["CENTRAL ROCK", "Central Rock", "central rock ", "Central Rock Gym", "CENTRAL  ROCK"],
+    "MOVEMENT, VA": ["MOVEMENT, VA", "Movement , VA", "Movement Crystal City"],
+    "MOVEMENT, MD": ["MOVEMENT, MD", "movement,md", "Movement Columbia"],
+    "VERTICAL VENTURES": ["VERTICAL VENTURES", "VerticalVentures", "Vertical Ventures"],
+    "UPLIFT": ["UPLIFT", "Uplift, WA", "Uplift Climbing"],
+    "EDINBURGH INTERNATIONAL CLIMBING ARENA": ["EDINBURGH INTERNATIONAL CLIMBING ARENA", "Edinburgh Intl Climbing Arena"],
+}
+
+# Free-text notes people leave in grade cells next to the numbers
+CELL_NOTES = ["kinda", "tried...nearly got 2", "tried 1?", "tried 2 basically got 1"]
+
+COMMENTS = ["", "", "", "", "tired", "new set", "with friends", "finger felt off", "good session"]
+
+
+def _cell(completed, tried, rng):
+    """Spell a (completed, tried) pair the way the sheet does: "", "3", "tried", "tried 2", "1 tried 3 other"..."""
+    if tried == 0:
+        return str(completed) if completed else ""
+    if completed == 0:
+        return "tried" if tried == 1 and rng.random() < 0.5 else f"tried {tried}"
+    other = "other" if tried == 1 or rng.random() < 0.5 else "others"
+    return f"{completed} tried {tried} {other}"
+
+
+def generate_log(sessions=1000, years=2, gyms=3, grades=GRADES, seed=0, start="2015-01-01",
+                 alias_rate=0.2, note_rate=0.01):
+    """Return a raw log frame with Location, Dates, one column per grade and Comments.
+
+    Climbers get stronger over the log, so harder grades start out mostly
+    blank or "tried" and fill in later. Dates are sorted and written as
+    m/d/yyyy; several sessions can fall on the same day.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start)
+    span_days = max(int(years * 365.25), 1)
+    dates = start + pd.to_timedelta(np.sort(rng.integers(0, span_days, sessions)), unit="D")
+
+    # Mostly one home gym, with trips elsewhere
+    gym_keys = list(GYM_SPELLINGS)[:max(1, min(gyms, len(GYM_SPELLINGS)))]
+    weights = np.array([0.7] + [0.3 / max(len(gym_keys) - 1, 1)] * (len(gym_keys) - 1))
+    gym_codes = rng.choice(len(gym_keys), sessions, p=weights / weights.sum())
+    aliased = rng.random(sessions) < alias_rate
+    locations = []
+    for code, alias in zip(gym_codes, aliased):
+        spellings = GYM_SPELLINGS[gym_keys[code]]
+        locations.append(spellings[rng.integers(1, len(spellings))] if alias and len(spellings) > 1 else spellings[0])
+
+    log = pd.DataFrame({"Location": locations, "Dates": [f"{d.month}/{d.day}/{d.year}" for d in dates]})
+
+    # Ability climbs from vb-v1 towards the top grades over the whole log
+    progress = np.linspace(0, 1, sessions)
+    for i, grade in enumerate(grades):
+        level = 1.5 + progress * (len(grades) - 1.5) - i
+        completed = rng.poisson(np.clip(2.5 * np.exp(-0.5 * (level - 1.5) ** 2) * (level > 0), 0, None))
+        tried = rng.poisson(np.clip(0.8 * np.exp(-0.5 * level ** 2), 0, None))
+        cells = [_cell(c, t, rng) for c, t in zip(completed, tried)]
+        for row in np.flatnonzero(rng.random(sessions) < note_rate):
+            cells[row] = CELL_NOTES[rng.integers(len(CELL_NOTES))]
+        log[grade] = cells
+
+    log["Comments"] = rng.choice(COMMENTS, sessions)
+    return log.replace("", np.nan)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic climbing log CSV")
+    parser.add_argument("--sessions", type=int, default=1000, help="number of rows (default: 1000)")
+    parser.add_argument("--years", type=float, default=2, help="span of the log in years (default: 2)")
+    parser.add_argument("--gyms", type=int, default=3, help=f"number of gyms, up to {len(GYM_SPELLINGS)} (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("-o", "--output", default="synthetic_log.csv", help="CSV path (default: synthetic_log.csv)")
+    args = parser.parse_args(argv)
+
+    log = generate_log(args.sessions, args.years, args.gyms, seed=args.seed)
+    log.to_csv(args.output, index=False)
+    print(f"Wrote {len(log)} sessions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+# The chalktopus modules live at the repository root; this file puts it on sys.path for the tests
+import pytest
+
+import chalktopus_datasets
+import chalktopus_locations
+import chalktopus_snapshot
+import chalktopus_store
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch):
+    """Point every on-disk cache at the test's own directory, so tests never touch the developer's .chalktopus_cache"""
+    monkeypatch.setattr(chalktopus_snapshot, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(chalktopus_store, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(chalktopus_store, "STORE_PATH", str(tmp_path / "sessions.feather"))
+    monkeypatch.setattr(chalktopus_datasets, "STORE_PATH", str(tmp_path / "sessions.feather"))
+    monkeypatch.setattr(chalktopus_locations, "MATCHES_PATH", str(tmp_path / "location_matches.json"))
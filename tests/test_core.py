@@ -0,0 +1,24 @@
+import pandas as pd
+
+import chalktopus_core as core
+
+
+def test_rolling_window_includes_later_sessions_on_the_same_day():
+    data = pd.DataFrame({"Dates": pd.to_datetime(["2024-01-01", "2024-01-05", "2024-01-05"]), "Score": [7.0, 7.0, 7.0]})
+    state = core.build_rolling_state(data, ["Score"])
+    assert core.rolling_window(state, "7D")["Score"].tolist() == [1.0, 3.0, 3.0]
+    assert core.rolling_window(state, "7D", stat="session")["Score"].tolist() == [7.0, 7.0, 7.0]
+
+
+def test_extended_rollup_cube_matches_a_fresh_one():
+    sessions = pd.DataFrame({
+        "Dates": pd.to_datetime(["2024-01-01", "2024-01-03", "2024-02-10", "2024-02-11"]),
+        "Location": ["A", "B", "A", "C"],
+        "v0_completed": [1, 2, 3, 4],
+        "v0_tried": [0, 1, 0, 2],
+    })
+    scores = pd.DataFrame({"Method": [1.5, 2.0, 0.5, 3.0]})
+    extended = core.extend_rollup_cube(core.build_rollup_cube(sessions.iloc[:2], scores), sessions.iloc[2:], scores)
+    fresh = core.build_rollup_cube(sessions, scores)
+    for period in fresh:
+        pd.testing.assert_frame_equal(extended[period], fresh[period])
@@ -0,0 +1,60 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import chalktopus_core
+import chalktopus_dates
+import chalktopus_datasets
+from chalktopus_dates import parse_dates
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The same log, exported once with years and once without
+YEARLESS = os.path.join(ROOT, "Rock Climbing - central rock.csv")
+WITH_YEARS = os.path.join(ROOT, "20250212_rockclimbing.csv")
+
+
+def _dates(path):
+    return pd.read_csv(path)["Dates"]
+
+
+def test_first_year_matches_the_log_with_years():
+    dates, info = parse_dates(_dates(YEARLESS), source="test-first-year", first_year=2023)
+    expected, _ = parse_dates(_dates(WITH_YEARS), source="test-with-years")
+    assert info["inferred"] and info["first_year"] == 2023
+    assert (dates.to_numpy() == expected.to_numpy()[:len(dates)]).all()
+
+
+def test_anchor_pins_the_years():
+    dates, info = parse_dates(_dates(YEARLESS), source="test-anchor", anchor=pd.Timestamp("2025-02-12"))
+    assert info["first_year"] == 2023
+    assert dates.min() == pd.Timestamp("2023-04-30")
+    assert dates.max() == pd.Timestamp("2024-12-29")
+
+
+def test_anchor_before_the_last_day_of_its_year_goes_back_a_year():
+    dates, info = parse_dates(pd.Series(["30 Dec", "2 Jan"]), source="test-rollover", anchor=pd.Timestamp("2025-01-01"))
+    assert list(dates) == [pd.Timestamp("2023-12-30"), pd.Timestamp("2024-01-02")]
+    assert info["first_year"] == 2023
+
+
+def test_yearless_dates_need_an_anchor(monkeypatch):
+    monkeypatch.setattr(chalktopus_dates, "FIRST_YEAR", None)
+    with pytest.raises(ValueError):
+        parse_dates(_dates(YEARLESS), source="test-no-anchor")
+
+
+def test_bundled_yearless_log_loads_with_its_real_dates(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    sessions, _ = chalktopus_datasets.load_dataset("central rock", datasets=chalktopus_datasets.DEFAULT_DATASETS)
+    assert sessions["Dates"].min() == pd.Timestamp("2023-04-30")
+    assert sessions["Dates"].max() == pd.Timestamp("2024-12-29")
+
+
+def test_core_cli_dates_the_bundled_log_from_its_dataset(monkeypatch, capsys):
+    monkeypatch.chdir(ROOT)
+    chalktopus_core.main([os.path.basename(YEARLESS), "--report", "scores", "--no-store"])
+    dates = pd.read_csv(io.StringIO(capsys.readouterr().out))["Dates"]
+    assert (dates.min(), dates.max()) == ("2023-04-30", "2024-12-29")
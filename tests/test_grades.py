@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chalktopus_core import GRADES, parse_grade_columns
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_value(value):
+    """The dashboard's original per-cell parser, which parse_grade_columns has to match"""
+    if pd.isna(value):
+        return 0, 0
+    if isinstance(value, str):
+        parts = value.split()
+        if len(parts) >= 3 and "tried" in parts:
+            tried_index = parts.index("tried")
+            completed = int(parts[tried_index - 1]) if tried_index > 0 and parts[tried_index - 1].isdigit() else 0
+            tried = int(parts[tried_index + 1]) if tried_index + 1 < len(parts) and parts[tried_index + 1].isdigit() else 0
+            return completed, tried
+        elif "tried" in parts:
+            numbers = [int(s) for s in parts if s.isdigit()]
+            if numbers:
+                return 0, numbers[0]
+        elif value.isdigit():
+            return int(value), 0
+        return 0, 0
+    try:
+        return int(value), 0
+    except (ValueError, TypeError):
+        return 0, 0
+
+
+def _reference(raw, grades):
+    # Object dtype hands parse_value the same str/float cells the old row loop saw
+    cells = raw[grades].astype(object)
+    pairs = [[parse_value(value) for value in cells[col]] for col in grades]
+    return np.array([[c for c, _ in col] for col in pairs]).T, np.array([[t for _, t in col] for col in pairs]).T
+
+
+@pytest.mark.parametrize("name", ["20250212_rockclimbing.csv", "Rock Climbing - central rock.csv"])
+def test_bundled_logs_parse_like_the_per_cell_parser(name):
+    raw = pd.read_csv(os.path.join(ROOT, name))
+    grades = [col for col in GRADES if col in raw.columns]
+    completed, tried = parse_grade_columns(raw, grades)
+    expected_completed, expected_tried = _reference(raw, grades)
+    assert (completed == expected_completed).all()
+    assert (tried == expected_tried).all()
+    # Guards against both sides parsing nothing
+    assert completed.sum() > 0 and tried.sum() > 0
+
+
+def test_cell_formats_parse_like_the_per_cell_parser():
+    cells = ["3", "tried", "tried 2", "1 tried 3 other", "2 tried", "tried x 4", "x tried 5", "3 climbs", " 4", None, "0 tried 0"]
+    raw = pd.DataFrame({"v0": cells, "v1": [float(i) if i % 3 else np.nan for i in range(len(cells))]})
+    completed, tried = parse_grade_columns(raw, ["v0", "v1"])
+    expected_completed, expected_tried = _reference(raw, ["v0", "v1"])
+    assert (completed == expected_completed).all()
+    assert (tried == expected_tried).all()
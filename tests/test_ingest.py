@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+
+from chalktopus_ingest import clear_cache, ingest_rows
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _raw(name):
+    return pd.read_csv(os.path.join(ROOT, name))
+
+
+def test_appended_rows_match_a_full_ingest():
+    raw = _raw("20250212_rockclimbing.csv")
+    ingest_rows(raw.iloc[:50], source="test-append")
+    data, stats = ingest_rows(raw, source="test-append")
+    assert (stats["processed"], stats["reused"]) == (len(raw) - 50, 50)
+    assert data.equals(ingest_rows(raw, source="test-append-full")[0])
+
+
+def test_yearless_rows_continue_the_years_before_them():
+    raw = _raw("Rock Climbing - central rock.csv")
+    # The split falls in the first year; the appended rows cross into the next one
+    ingest_rows(raw.iloc[:20], source="test-yearless", first_year=2023)
+    data, stats = ingest_rows(raw, source="test-yearless", first_year=2023)
+    assert stats["reused"] == 20
+    assert data.equals(ingest_rows(raw, source="test-yearless-full", first_year=2023)[0])
+
+
+def test_only_edited_rows_are_ingested_again():
+    raw = _raw("20250212_rockclimbing.csv")
+    ingest_rows(raw, source="test-edit")
+    edited = raw.copy()
+    edited.loc[3, "Location"] = "MOVEMENT"
+    data, stats = ingest_rows(edited, source="test-edit")
+    assert stats["reused"] == len(raw) - 1
+    assert data.equals(ingest_rows(edited, source="test-edit-full")[0])
+
+
+def test_yearless_edits_and_deletions_match_a_full_ingest():
+    raw = _raw("Rock Climbing - central rock.csv")
+    ingest_rows(raw, source="test-yearless-edit", first_year=2023)
+    edited = raw.drop(index=10).reset_index(drop=True)
+    edited.loc[30, "Location"] = "MOVEMENT"
+    data, stats = ingest_rows(edited, source="test-yearless-edit", first_year=2023)
+    assert stats["reused"] == len(edited) - 1
+    assert data.equals(ingest_rows(edited, source="test-yearless-edit-full", first_year=2023)[0])
+
+
+def test_clear_cache_forgets_only_that_source():
+    raw = _raw("20250212_rockclimbing.csv")
+    ingest_rows(raw, source="test-clear")
+    ingest_rows(raw, source="test-kept")
+    clear_cache("test-clear")
+    assert ingest_rows(raw, source="test-clear")[1]["reused"] == 0
+    assert ingest_rows(raw, source="test-kept")[1]["reused"] == len(raw)
@@ -0,0 +1,62 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import chalktopus_snapshot
+from chalktopus_snapshot import fetch_csv_snapshot
+
+
+class _Sheet(BaseHTTPRequestHandler):
+    """Serves server.body with an ETag, answering 304 when the client already has it"""
+
+    def do_GET(self):
+        etag = f'"{hash(self.server.body)}"'
+        self.server.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sheet():
+    server = HTTPServer(("127.0.0.1", 0), _Sheet)
+    server.body, server.requests = b"Dates,Location\n1/2/2024,MOVEMENT\n", []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_revalidates_once_the_ttl_is_up(sheet, tmp_path, monkeypatch):
+    url = f"http://127.0.0.1:{sheet.server_port}/export.csv"
+
+    data, info = fetch_csv_snapshot(url, snapshot_dir=tmp_path, ttl=60)
+    assert info["status"] == "updated" and list(data["Location"]) == ["MOVEMENT"]
+
+    # Within the TTL the snapshot is used without asking the server
+    assert fetch_csv_snapshot(url, snapshot_dir=tmp_path, ttl=60)[1]["status"] == "fresh"
+    assert len(sheet.requests) == 1
+
+    later = time.time() + 61
+    monkeypatch.setattr(chalktopus_snapshot.time, "time", lambda: later)
+    data, info = fetch_csv_snapshot(url, snapshot_dir=tmp_path, ttl=60)
+    assert info["status"] == "not-modified" and list(data["Location"]) == ["MOVEMENT"]
+    assert sheet.requests[-1] == info["etag"]
+
+    # A changed sheet is downloaded again once the refreshed TTL is up too
+    sheet.body += b"1/3/2024,CENTRAL ROCK\n"
+    later += 61
+    data, info = fetch_csv_snapshot(url, snapshot_dir=tmp_path, ttl=60)
+    assert info["status"] == "updated" and list(data["Location"]) == ["MOVEMENT", "CENTRAL ROCK"]
+    assert len(sheet.requests) == 3